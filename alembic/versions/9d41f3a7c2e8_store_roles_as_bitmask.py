@@ -0,0 +1,79 @@
+"""store roles as bitmask
+
+Revision ID: 9d41f3a7c2e8
+Revises: 5e2b8d41a9c3
+Create Date: 2026-10-18 13:05:47.120934
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d41f3a7c2e8"
+down_revision: Union[str, None] = "5e2b8d41a9c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Копия битов из shared.db.models: миграция не должна зависеть от моделей
+ROLE_BITS = {"admin": 1, "manager": 2, "user": 4}
+
+
+def _has_roles_column() -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns("users")
+    return any(column["name"] == "roles" for column in columns)
+
+
+users = sa.table(
+    "users",
+    sa.column("roles", sa.JSON),
+    sa.column("role_mask", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    # NOT NULL сразу: существующие строки получают 0 и заполняются ниже
+    op.add_column(
+        "users",
+        sa.Column("role_mask", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_index(op.f("ix_users_role_mask"), "users", ["role_mask"], unique=False)
+
+    # Колонка roles могла быть создана через create_all, а не миграцией
+    has_roles = _has_roles_column()
+    if has_roles:
+        # Один UPDATE на всю таблицу: маска собирается из проверок вхождения
+        # роли в JSON-массив, одинаково для PostgreSQL и SQLite
+        roles_text = sa.cast(users.c.roles, sa.Text)
+        mask = sum(
+            sa.case((roles_text.like(f'%"{role}"%'), bit), else_=0)
+            for role, bit in ROLE_BITS.items()
+        )
+        op.execute(users.update().values(role_mask=mask))
+    # Пользователь без ролей получает роль user, как в модели
+    op.execute(
+        users.update().where(users.c.role_mask == 0).values(role_mask=ROLE_BITS["user"])
+    )
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.alter_column(
+            "role_mask",
+            existing_type=sa.Integer(),
+            existing_nullable=False,
+            server_default=str(ROLE_BITS["user"]),
+        )
+        if has_roles:
+            batch_op.drop_column("roles")
+
+
+def downgrade() -> None:
+    op.add_column("users", sa.Column("roles", sa.JSON(), nullable=True))
+    # Один UPDATE на каждое из возможных значений маски
+    for mask in range(1 << len(ROLE_BITS)):
+        roles = [role for role, bit in ROLE_BITS.items() if mask & bit]
+        op.execute(users.update().where(users.c.role_mask == mask).values(roles=roles))
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_index(batch_op.f("ix_users_role_mask"))
+        batch_op.drop_column("role_mask")
@@ -0,0 +1,58 @@
+"""Сравнение двух прогонов бенчмарков и поиск регрессий.
+
+Запуск: python -m benchmarks.compare baseline.json current.json --threshold 20
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Для задержек рост - регрессия, для пропускной способности - падение
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = ("ops_per_sec",)
+
+
+def find_regressions(baseline: dict, current: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, before in baseline["results"].items():
+        after = current["results"].get(name)
+        if after is None:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    f"{name}.{metric}: {old:.3f} -> {new:.3f} ({change:+.1f}%)"
+                )
+        if after.get("errors", 0) > before.get("errors", 0):
+            regressions.append(
+                f"{name}.errors: {before.get('errors', 0)} -> {after['errors']}"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--threshold", type=float, default=20.0, help="Допустимое ухудшение, %%"
+    )
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    regressions = find_regressions(baseline, current, args.threshold)
+    for line in regressions:
+        print(line)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
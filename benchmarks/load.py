@@ -0,0 +1,217 @@
+"""Нагрузочный прогон /auth/login, /auth/refresh, /api/users/me и /api/users/.
+
+Приложение запускается в том же процессе поверх временной SQLite-базы.
+Запуск: python -m benchmarks.load --concurrency 20 --requests 500
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.results import print_table, summarize, write_results
+from services.service_gateway.main import app
+from shared.core.hashing import password_hasher
+from shared.core.rate_limit import login_rate_limiter
+from shared.core.security import auth
+from shared.db.database import Base
+from shared.db.models import UserRole
+from shared.db.repositories.user_repository import UserRepository
+from shared.db.schemas.user import UserCreateInDB
+from shared.db.session import LazySession, TrackedSession, get_db
+
+PASSWORD = "load-test-password"
+
+# Сценарий получает номер запроса и номер воркера, возвращает HTTP-статус
+Scenario = Callable[[AsyncClient, int, int], Awaitable[int]]
+
+
+async def setup_database(path: Path, users: int) -> sessionmaker:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(
+        engine,
+        class_=AsyncSession,
+        sync_session_class=TrackedSession,
+        expire_on_commit=False,
+    )
+
+    # Один хеш на всех пользователей: подготовка не должна занимать минуты
+    hashed_password = auth.get_password_hash(PASSWORD)
+    async with session_factory() as session:
+        await UserRepository(session).bulk_create(
+            [
+                UserCreateInDB(
+                    username=f"load{i:05d}",
+                    email=f"load{i:05d}@example.com",
+                    hashed_password=hashed_password,
+                    roles=[UserRole.ADMIN] if i == 0 else [UserRole.USER],
+                )
+                for i in range(users)
+            ]
+        )
+    return session_factory
+
+
+def email(index: int) -> str:
+    return f"load{index:05d}@example.com"
+
+
+async def login(client: AsyncClient, index: int) -> dict:
+    response = await client.post(
+        "/auth/login", data={"username": email(index), "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def make_scenarios(tokens: dict[int, dict], users: int) -> dict[str, Scenario]:
+    admin_headers = {"Authorization": f"Bearer {tokens[0]['access_token']}"}
+
+    async def login_scenario(client: AsyncClient, n: int, worker: int) -> int:
+        response = await client.post(
+            "/auth/login",
+            data={"username": email(n % users), "password": PASSWORD},
+        )
+        return response.status_code
+
+    async def refresh_scenario(client: AsyncClient, n: int, worker: int) -> int:
+        # Refresh-токен одноразовый: каждый воркер ведет свою цепочку
+        slot = worker % len(tokens)
+        response = await client.post(
+            "/auth/refresh", json={"refresh_token": tokens[slot]["refresh_token"]}
+        )
+        if response.status_code == 200:
+            tokens[slot] = response.json()
+        return response.status_code
+
+    async def me_scenario(client: AsyncClient, n: int, worker: int) -> int:
+        token = tokens[n % len(tokens)]["access_token"]
+        response = await client.get(
+            "/api/users/me", headers={"Authorization": f"Bearer {token}"}
+        )
+        return response.status_code
+
+    async def list_scenario(client: AsyncClient, n: int, worker: int) -> int:
+        response = await client.get(
+            "/api/users/", params={"limit": 50}, headers=admin_headers
+        )
+        return response.status_code
+
+    return {
+        "login": login_scenario,
+        "refresh": refresh_scenario,
+        "users_me": me_scenario,
+        "users_list": list_scenario,
+    }
+
+
+async def run_scenario(
+    client: AsyncClient, scenario: Scenario, requests: int, concurrency: int
+) -> dict:
+    samples: list[float] = []
+    statuses: dict[int, int] = defaultdict(int)
+    counter = iter(range(requests))
+
+    async def worker(worker_id: int) -> None:
+        for n in counter:
+            started = time.perf_counter()
+            try:
+                status = await scenario(client, n, worker_id)
+            except Exception:
+                status = 0
+            samples.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    summary = summarize(samples, elapsed=time.perf_counter() - started)
+    summary["errors"] = sum(
+        count for status, count in statuses.items() if not 200 <= status < 300
+    )
+    summary["statuses"] = {str(status): count for status, count in statuses.items()}
+    return summary
+
+
+async def run(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = await setup_database(Path(tmp) / "load.db", args.users)
+
+        async def override_get_db():
+            session = LazySession(session_factory)
+            try:
+                yield session
+            finally:
+                await session.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        # Прогон идет с одного адреса, ограничение входа исказило бы результат
+        login_rate_limiter.enabled = False
+        try:
+            transport = ASGITransport(app=app)
+            async with AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+                token_slots = min(args.concurrency, args.users)
+                tokens = {i: await login(client, i) for i in range(token_slots)}
+                scenarios = make_scenarios(tokens, args.users)
+                selected = args.scenarios or list(scenarios)
+                results = {}
+                for name in selected:
+                    if name == "login":
+                        requests, concurrency = (
+                            args.login_requests,
+                            args.login_concurrency,
+                        )
+                    else:
+                        requests, concurrency = args.requests, args.concurrency
+                    results[f"http.{name}"] = await run_scenario(
+                        client, scenarios[name], requests, concurrency
+                    )
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            login_rate_limiter.enabled = True
+            password_hasher.shutdown()
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument(
+        "--login-requests",
+        type=int,
+        default=100,
+        help="Вход упирается в bcrypt, поэтому запросов меньше",
+    )
+    parser.add_argument(
+        "--login-concurrency",
+        type=int,
+        default=4,
+        help="Параллельные входы сверх пула хеширования получают 503",
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument(
+        "--scenarios",
+        nargs="*",
+        choices=["login", "refresh", "users_me", "users_list"],
+    )
+    parser.add_argument("--output", help="JSON-файл с результатами (иначе stdout)")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    write_results(args.output, "load", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Микробенчмарки токенов, хеширования, схем и запросов репозитория.
+
+Запуск: python -m benchmarks.micro --output micro.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.results import print_table, summarize, write_results
+from services.user_service.serialization import render_users
+from shared.core.hashing import pwd_context
+from shared.core.security import Auth
+from shared.core.token_cache import token_memo
+from shared.db.database import Base, get_engine
+from shared.db.models import User
+from shared.db.repositories.user_repository import UserRepository
+from shared.db.schemas.user import UserCreate, UserCreateInDB, UserResponse
+
+
+def bench(func: Callable[[], object], iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def bench_async(func: Callable[[], Awaitable[object]], iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def token_benchmarks(iterations: int) -> dict:
+    claims = {"sub": "bench@example.com"}
+    token = Auth.create_access_token(claims)
+
+    def decode_cached():
+        Auth.decode_token(token)
+
+    def decode_uncached():
+        token_memo.clear()
+        Auth.decode_token(token)
+
+    return {
+        "token.create": bench(lambda: Auth.create_access_token(claims), iterations),
+        "token.verify": bench(lambda: Auth._verify_token(token), iterations),
+        "token.decode_uncached": bench(decode_uncached, iterations),
+        "token.decode_cached": bench(decode_cached, iterations),
+    }
+
+
+def password_benchmarks(iterations: int) -> dict:
+    hashed = pwd_context.hash("benchmark-password")
+    return {
+        "password.hash": bench(
+            lambda: pwd_context.hash("benchmark-password"), iterations
+        ),
+        "password.verify": bench(
+            lambda: pwd_context.verify("benchmark-password", hashed), iterations
+        ),
+    }
+
+
+def schema_benchmarks(iterations: int) -> dict:
+    payload = {
+        "username": "bench",
+        "email": "bench@example.com",
+        "password": "benchmark-password",
+        "roles": ["user", "manager"],
+    }
+    user = User(
+        id=1,
+        username="bench",
+        email="bench@example.com",
+        is_active=True,
+        roles=["user", "manager"],
+        version=1,
+    )
+    return {
+        "schema.user_create": bench(
+            lambda: UserCreate.model_validate(payload), iterations
+        ),
+        "schema.user_response": bench(
+            lambda: UserResponse.model_validate(user).model_dump_json(), iterations
+        ),
+    }
+
+
+async def repository_benchmarks(iterations: int, users: int) -> dict:
+    engine = get_engine(test_mode=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_factory() as session:
+        repository = UserRepository(session)
+        await repository.bulk_create(
+            [
+                UserCreateInDB(
+                    username=f"user{i:06d}",
+                    email=f"user{i:06d}@example.com",
+                    hashed_password="not-a-real-hash",
+                )
+                for i in range(users)
+            ]
+        )
+
+        middle = users // 2
+        results = {
+            "repo.get_by_id": await bench_async(
+                lambda: repository.get_by_id(middle), iterations
+            ),
+            "repo.get_by_email": await bench_async(
+                lambda: repository.get_by_email(f"user{middle:06d}@example.com"),
+                iterations,
+            ),
+            "repo.get_by_email_cached": await bench_async(
+                lambda: repository.get_by_email(
+                    f"user{middle:06d}@example.com", use_cache=True
+                ),
+                iterations,
+            ),
+            "repo.list_page_100": await bench_async(
+                lambda: repository.list_page(limit=100), iterations
+            ),
+            "repo.list_page_rows_100": await bench_async(
+                lambda: repository.list_page_rows(limit=100), iterations
+            ),
+        }
+
+        # Сериализация страницы: ORM + from_attributes против строк колонок
+        users, _ = await repository.list_page(limit=100)
+        rows, _ = await repository.list_page_rows(limit=100)
+        results["serialize.orm_page_100"] = bench(
+            lambda: json.dumps(
+                jsonable_encoder([UserResponse.model_validate(user) for user in users])
+            ).encode(),
+            iterations,
+        )
+        results["serialize.rows_page_100"] = bench(
+            lambda: render_users(rows), iterations
+        )
+    await engine.dispose()
+    return results
+
+
+async def run(args: argparse.Namespace) -> dict:
+    results: dict = {}
+    results.update(token_benchmarks(args.iterations))
+    results.update(password_benchmarks(args.hash_iterations))
+    results.update(schema_benchmarks(args.iterations))
+    results.update(await repository_benchmarks(args.iterations, args.users))
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--hash-iterations", type=int, default=10)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--output", help="JSON-файл с результатами (иначе stdout)")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    write_results(args.output, "micro", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+import math
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
+
+from shared.core.config import settings
+
+
+def percentile(sorted_samples: list[float], q: float) -> float:
+    # Перцентиль методом ближайшего ранга по отсортированной выборке
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples: Iterable[float], elapsed: float | None = None) -> dict:
+    # samples - длительности операций в секундах, в отчете миллисекунды
+    ordered = sorted(samples)
+    count = len(ordered)
+    total = sum(ordered)
+    summary = {
+        "count": count,
+        "mean_ms": total / count * 1000 if count else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if count else 0.0,
+    }
+    duration = elapsed if elapsed is not None else total
+    summary["ops_per_sec"] = count / duration if duration else 0.0
+    return summary
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "password_schemes": settings.PASSWORD_SCHEMES,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "hashing_pool": f"{settings.HASHING_POOL_KIND}x{settings.HASHING_POOL_WORKERS}",
+    }
+
+
+def write_results(path: str | None, suite: str, results: dict, params: dict) -> dict:
+    report = {
+        "suite": suite,
+        "environment": environment(),
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        Path(path).write_text(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+def print_table(results: dict) -> None:
+    print(
+        f"{'benchmark':<32} {'count':>7} {'ops/s':>10} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}",
+        file=sys.stderr,
+    )
+    for name, summary in results.items():
+        print(
+            f"{name:<32} {summary['count']:>7} {summary['ops_per_sec']:>10.1f} "
+            f"{summary['p50_ms']:>9.3f} {summary['p95_ms']:>9.3f} "
+            f"{summary['p99_ms']:>9.3f}",
+            file=sys.stderr,
+        )
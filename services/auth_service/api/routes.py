@@ -1,40 +1,199 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hmac
+import time
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared.db.schemas.user import UserCreate, UserResponse
 from shared.db.session import get_db
 from services.auth_service.service import AuthService
-from shared.core.security import auth
-from shared.db.schemas.token import Token  # Add this import
+from shared.core.client_ip import client_ip
+from shared.core.hashing import HashingError
+from shared.core.config import settings
+from shared.core.keys import is_asymmetric, keyring
+from shared.core.rate_limit import RateLimitExceeded, login_rate_limiter
+from shared.core.security import auth, oauth2_scheme
+from shared.db.schemas.token import (
+    IntrospectionBatchRequest,
+    IntrospectionBatchResponse,
+    IntrospectionResponse,
+    RefreshTokenRequest,
+    Token,
+)
 
 router = APIRouter()
 
 
+async def check_login_rate_limit(
+    request: Request, form_data: OAuth2PasswordRequestForm = Depends()
+):
+    try:
+        await login_rate_limiter.check(form_data.username, client_ip(request))
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(max(1, int(e.retry_after + 0.5)))},
+        )
+
+
 @router.post("/register", response_model=UserResponse, status_code=201)
 async def register(form_data: UserCreate, db: AsyncSession = Depends(get_db)):
     auth_service = AuthService(db)
     try:
         return await auth_service.register_user(form_data)
+    except HashingError:
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/login", response_model=Token)
+@router.post(
+    "/login", response_model=Token, dependencies=[Depends(check_login_rate_limit)]
+)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
     auth_service = AuthService(db)
-    result = await auth_service.authenticate_user(
-        form_data.username, form_data.password
-    )
+    try:
+        result = await auth_service.authenticate_user(
+            form_data.username, form_data.password
+        )
+    except HashingError:
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
 
     if not result:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
+    await login_rate_limiter.reset_account(form_data.username)
     return result
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(current_user: UserResponse = Depends(auth.get_current_user)):
-    access_token = auth.create_access_token(data={"sub": current_user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+async def refresh_token(
+    form_data: RefreshTokenRequest, db: AsyncSession = Depends(get_db)
+):
+    auth_service = AuthService(db)
+    result = await auth_service.refresh_tokens(form_data.refresh_token)
+    if not result:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return result
+
+
+@router.post("/logout", status_code=204)
+async def logout(
+    form_data: RefreshTokenRequest | None = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+):
+    # Access-токен перестает приниматься сразу, refresh-токен (если передан)
+    # отзывается вместе со всей цепочкой
+    try:
+        auth.decode_access_token(token)
+    except (JWTError, ValueError):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    auth.revoke_token(token)
+    if form_data is not None:
+        await AuthService(db).revoke_refresh_token(form_data.refresh_token)
+    return Response(status_code=204)
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks():
+    # При HS256 публиковать нечего: общий секрет не раскрывается
+    keys = keyring.jwks() if is_asymmetric(settings.ALGORITHM) else {"keys": []}
+    return JSONResponse(
+        keys,
+        headers={
+            "Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}"
+        },
+    )
+
+
+async def check_introspection_client(request: Request):
+    # RFC 7662, 2.1: вызывающий обязан быть авторизован. Без настроенных
+    # секретов клиентов интроспекция закрыта для всех.
+    secrets = settings.INTROSPECTION_CLIENT_SECRETS
+    scheme, _, credential = request.headers.get("authorization", "").partition(" ")
+    if (
+        not secrets
+        or scheme.lower() != "bearer"
+        or not any(
+            hmac.compare_digest(credential.encode(), secret.encode())
+            for secret in secrets
+        )
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid introspection client",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def introspection_cache_control(results: list[dict]) -> str:
+    # Ответ можно кешировать не дольше, чем живет самый короткий активный токен
+    max_age = settings.INTROSPECTION_CACHE_MAX_AGE_SECONDS
+    now = time.time()
+    for result in results:
+        if result["active"] and result.get("exp") is not None:
+            max_age = min(max_age, int(result["exp"] - now))
+    return f"private, max-age={max_age}" if max_age > 0 else "no-store"
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectionResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(check_introspection_client)],
+)
+async def introspect(
+    token: str = Form(...),
+    token_type_hint: str | None = Form(None),
+    db: AsyncSession = Depends(get_db),
+):
+    results = await AuthService(db).introspect_tokens([token])
+    return JSONResponse(
+        IntrospectionResponse(**results[0]).model_dump(mode="json", exclude_none=True),
+        headers={"Cache-Control": introspection_cache_control(results)},
+    )
+
+
+@router.post(
+    "/introspect/batch",
+    response_model=IntrospectionBatchResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(check_introspection_client)],
+)
+async def introspect_batch(
+    request_data: IntrospectionBatchRequest, db: AsyncSession = Depends(get_db)
+):
+    if len(request_data.tokens) > settings.INTROSPECTION_BATCH_MAX_TOKENS:
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                "Too many tokens, the limit is "
+                f"{settings.INTROSPECTION_BATCH_MAX_TOKENS}"
+            ),
+        )
+    results = await AuthService(db).introspect_tokens(request_data.tokens)
+    response = IntrospectionBatchResponse(
+        results=[IntrospectionResponse(**result) for result in results]
+    )
+    return JSONResponse(
+        response.model_dump(mode="json", exclude_none=True),
+        headers={"Cache-Control": introspection_cache_control(results)},
+    )
@@ -1,21 +1,35 @@
 from fastapi import FastAPI
 from services.auth_service.api.routes import router
 from shared.core.config import settings
-from shared.db.database import engine, Base
+from shared.core.lifecycle import (
+    create_lifespan,
+    readiness_endpoint,
+    service_jobs,
+    service_steps,
+)
 
-app = FastAPI(title=settings.PROJECT_NAME)
 
-# Создание таблиц в базе данных
-Base.metadata.create_all(bind=engine)
+async def root():
+    return {"message": "Welcome to Auth Service"}
 
-# Подключение роутов
-app.include_router(router, prefix="/auth", tags=["auth"])
 
+def create_app() -> FastAPI:
+    # Таблицы создаются в lifespan через async engine, а не при импорте
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        lifespan=create_lifespan(
+            service_steps(create_tables=True), jobs=service_jobs()
+        ),
+    )
+
+    # Подключение роутов
+    app.include_router(router, prefix="/auth", tags=["auth"])
+    app.add_api_route("/", root)
+    app.add_api_route("/ready", readiness_endpoint, tags=["health"])
+    return app
 
-@app.get("/")
-async def root():
-    return {"message": "Welcome to Auth Service"}
 
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
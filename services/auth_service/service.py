@@ -1,30 +1,162 @@
-from shared.db.repositories.user_repository import UserRepository
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from jose import JWTError
+
+from shared.db.models import User
+from shared.db.repositories.refresh_token_repository import RefreshTokenRepository
+from shared.db.repositories.user_repository import (
+    UserAlreadyExistsError,
+    UserRepository,
+)
 from shared.db.schemas.user import UserCreate, UserCreateInDB, UserResponse
+from shared.core.config import settings
+from shared.core.log import logger
 from shared.core.security import auth
 
 
 class AuthService:
     def __init__(self, db_session):
         self.user_repository = UserRepository(db_session)
+        self.refresh_token_repository = RefreshTokenRepository(db_session)
 
     async def register_user(self, user: UserCreate) -> UserResponse:
-        existing_user = await self.user_repository.get_by_email(user.email)
-        if existing_user:
-            raise ValueError("Unable to register user with provided information")
-
-        hashed_password = auth.get_password_hash(user.password)
-        new_user = await self.user_repository.create(
-            UserCreateInDB(
-                email=user.email,
-                hashed_password=hashed_password,
-                username=user.username,
+        hashed_password = await auth.get_password_hash_async(user.password)
+        try:
+            new_user = await self.user_repository.create(
+                UserCreateInDB(
+                    email=user.email,
+                    hashed_password=hashed_password,
+                    username=user.username,
+                )
             )
-        )
+        except UserAlreadyExistsError:
+            raise ValueError("Unable to register user with provided information")
         return UserResponse.model_validate(new_user)
 
     async def authenticate_user(self, email: str, password: str):
         user = await self.user_repository.get_by_email(email)
-        if not user or not auth.verify_password(password, user.hashed_password):
+        if not user:
+            return None
+        verified, new_hash = await auth.verify_and_update_password_async(
+            password, user.hashed_password
+        )
+        if not verified:
+            return None
+        if new_hash is not None:
+            # Хеш создан устаревшей схемой или с другой стоимостью
+            await self.user_repository.update_password_hash(
+                user.id, user.hashed_password, new_hash
+            )
+        refresh_token = await self._create_refresh_token(user, str(uuid.uuid4()))
+        return self._token_response(user, refresh_token)
+
+    async def refresh_tokens(self, refresh_token: str):
+        try:
+            payload = auth.decode_refresh_token(refresh_token)
+        except JWTError:
+            return None
+
+        stored = await self.refresh_token_repository.get_by_jti(payload["jti"])
+        if stored is None:
+            return None
+        if stored.revoked:
+            # Повторное использование уже обмененного токена: токен мог быть
+            # украден, поэтому отзываем всю семью
+            logger.warning(
+                "Refresh token reuse detected for user {}, revoking family {}",
+                stored.user_id,
+                stored.family_id,
+            )
+            await self.refresh_token_repository.revoke_family(stored.family_id)
+            # Access-токены, выданные по украденной цепочке, тоже отзываются
+            user = await self.user_repository.get_by_id(stored.user_id)
+            if user is not None:
+                auth.revoke_user_tokens(user.email)
+            return None
+
+        user = await self.user_repository.get_by_id(stored.user_id)
+        if user is None or not user.is_active:
+            await self.refresh_token_repository.revoke_family(stored.family_id)
+            return None
+
+        jti = str(uuid.uuid4())
+        expires_delta = timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+        new_token = await self.refresh_token_repository.rotate(
+            stored, jti, datetime.now(timezone.utc) + expires_delta
+        )
+        if new_token is None:
+            await self.refresh_token_repository.revoke_family(stored.family_id)
             return None
-        access_token = auth.create_access_token(data={"sub": user.email})
-        return {"access_token": access_token, "token_type": "bearer"}
+        new_refresh_token = auth.create_refresh_token(
+            {"sub": user.email, "jti": jti, "typ": "refresh"}, expires_delta
+        )
+        return self._token_response(user, new_refresh_token)
+
+    async def revoke_refresh_token(self, refresh_token: str) -> None:
+        try:
+            payload = auth.decode_refresh_token(refresh_token)
+        except JWTError:
+            return
+        stored = await self.refresh_token_repository.get_by_jti(payload["jti"])
+        if stored is not None:
+            await self.refresh_token_repository.revoke_family(stored.family_id)
+
+    async def _create_refresh_token(self, user: User, family_id: str) -> str:
+        jti = str(uuid.uuid4())
+        expires_delta = timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+        await self.refresh_token_repository.create(
+            user_id=user.id,
+            jti=jti,
+            family_id=family_id,
+            expires_at=datetime.now(timezone.utc) + expires_delta,
+        )
+        return auth.create_refresh_token(
+            {"sub": user.email, "jti": jti, "typ": "refresh"}, expires_delta
+        )
+
+    async def introspect_tokens(self, tokens: list[str]) -> list[dict]:
+        # Повторяющиеся токены декодируются, а пользователи загружаются
+        # один раз на всю пачку
+        payloads: dict[str, dict | None] = {}
+        for token in tokens:
+            if token not in payloads:
+                try:
+                    payloads[token] = auth.decode_access_token(token)
+                except (JWTError, ValueError):
+                    payloads[token] = None
+
+        subjects = list(
+            dict.fromkeys(p["sub"] for p in payloads.values() if p is not None)
+        )
+        found = await self.user_repository.get_many_by_emails(
+            subjects, use_cache=True, chunk_size=settings.USER_LOOKUP_CHUNK_SIZE
+        )
+        users = dict(zip(subjects, found))
+
+        results = []
+        for token in tokens:
+            payload = payloads[token]
+            user = users.get(payload["sub"]) if payload is not None else None
+            if user is None or not user.is_active:
+                results.append({"active": False})
+                continue
+            results.append(
+                {
+                    "active": True,
+                    "sub": payload["sub"],
+                    "username": user.username,
+                    "roles": user.roles,
+                    "exp": payload.get("exp"),
+                    "token_type": "Bearer",
+                }
+            )
+        return results
+
+    @staticmethod
+    def _token_response(user: User, refresh_token: str) -> dict:
+        return {
+            "access_token": auth.create_user_access_token(user),
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+        }
@@ -1,8 +1,61 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from services.auth_service.api.routes import router as auth_router
 from services.user_service.api.routes import router as user_router
+from shared.db.database import engines
+from shared.db.pool import get_pool_status
+from shared.core.hashing import password_hasher
+from shared.core.metrics import registry
 
 router = APIRouter()
 
-router.include_router(auth_router, prefix="/auth", tags=["auth"])
-router.include_router(user_router, prefix="/api/users", tags=["users"])
+# Роутеры сервисов в процессе шлюза (GATEWAY_MODE=inprocess)
+services_router = APIRouter()
+services_router.include_router(auth_router, prefix="/auth", tags=["auth"])
+services_router.include_router(user_router, prefix="/api/users", tags=["users"])
+
+hashing_queue_depth = registry.gauge(
+    "password_hashing_queue_depth", "Password hashing jobs queued or running"
+)
+hashing_rejected = registry.counter(
+    "password_hashing_rejected_total", "Password hashing jobs rejected or timed out"
+)
+db_pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Database connections checked out"
+)
+db_pool_wait_seconds = registry.counter(
+    "db_pool_wait_seconds_total", "Time spent waiting for a database connection"
+)
+
+
+def collect_runtime_stats() -> None:
+    hashing = password_hasher.stats()
+    hashing_queue_depth.set(hashing["queue_depth"])
+    hashing_rejected.set_total(hashing["rejected"] + hashing["timed_out"])
+
+
+def collect_db_pool_stats() -> None:
+    # Регистрируется только в режиме inprocess. Обращение к engines.primary
+    # создало бы engine, поэтому до start пул не опрашивается
+    if not engines.started:
+        return
+    pool = get_pool_status(engines.primary)
+    db_pool_checked_out.set(pool.get("checked_out", 0))
+    db_pool_wait_seconds.set_total(pool.get("total_wait", 0.0))
+
+
+registry.add_collector(collect_runtime_stats)
+
+
+@router.get("/metrics", tags=["metrics"], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get("/metrics/db-pool", tags=["metrics"])
+async def db_pool_metrics():
+    status = get_pool_status(engines.primary)
+    status["replicas"] = engines.replica_set.status()
+    return status
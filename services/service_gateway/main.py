@@ -1,19 +1,70 @@
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from services.service_gateway.api.routes import router as gateway_router
+from services.service_gateway.api.routes import (
+    collect_db_pool_stats,
+    services_router,
+)
+from services.service_gateway.proxy import ReverseProxy, create_proxy_router
+from services.service_gateway.response_cache import (
+    ResponseCacheMiddleware,
+    response_cache,
+)
+from shared.core.config import settings
+from shared.core.lifecycle import (
+    create_lifespan,
+    readiness_endpoint,
+    service_jobs,
+    warm_up_signing_keys,
+)
+from shared.core.metrics import MetricsMiddleware, registry
 
-app = FastAPI(title="Service Gateway")
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app(mode: Optional[str] = None) -> FastAPI:
+    mode = mode or settings.GATEWAY_MODE
+    if mode == "inprocess":
+        lifespan = create_lifespan(jobs=service_jobs())
+        registry.add_collector(collect_db_pool_stats)
+    elif mode == "proxy":
+        proxy = ReverseProxy.from_settings()
+        # Шлюз сам не ходит в БД: ему нужны ключи для проверки токенов
+        # и хотя бы один готовый экземпляр каждого сервиса
+        lifespan = create_lifespan(
+            [("signing_keys", warm_up_signing_keys), ("upstreams", proxy.warm_up)],
+            on_shutdown=proxy.aclose,
+        )
+    else:
+        raise ValueError(f"Unknown gateway mode: {mode}")
+
+    app = FastAPI(title="Service Gateway", lifespan=lifespan)
+
+    if settings.RESPONSE_CACHE_TTL_SECONDS > 0:
+        app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(MetricsMiddleware)
+
+    if mode == "proxy":
+        app.include_router(create_proxy_router(proxy))
+    else:
+        app.include_router(services_router)
+    app.include_router(gateway_router)
+    # 200 только после прогрева пулов и ключей
+    app.add_api_route("/ready", readiness_endpoint, tags=["health"])
+    return app
+
 
-app.include_router(gateway_router)
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,317 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+import httpx
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from jose import JWTError
+from starlette.background import BackgroundTask
+
+from shared.core.client_ip import is_trusted_proxy
+from shared.core.config import settings
+from shared.core.log import log_sampled
+from shared.core.security import Auth
+
+PROXY_METHODS = ["GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"]
+# Повтор этих методов не меняет результат
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+# Запрос не был отправлен: повторять можно любой метод
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+
+
+@dataclass
+class Upstream:
+    url: str
+    in_flight: int = 0
+    failures: int = 0
+    # До этого момента экземпляр считается недоступным
+    unhealthy_until: float = 0.0
+
+
+class UpstreamPool:
+    # Экземпляры одного сервиса. Запрос получает доступный экземпляр с
+    # наименьшим числом запросов в работе; недоступный исключается на
+    # retry_after секунд.
+    def __init__(
+        self,
+        name: str,
+        urls: Sequence[str],
+        retry_after: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not urls:
+            raise ValueError(f"No upstream URLs configured for {name}")
+        self.name = name
+        self.retry_after = retry_after
+        self.clock = clock
+        self.upstreams = [Upstream(url.rstrip("/")) for url in urls]
+        self._next = 0
+
+    def choose(self, exclude: Sequence[Upstream] = ()) -> Optional[Upstream]:
+        now = self.clock()
+        healthy = [u for u in self.upstreams if u.unhealthy_until <= now]
+        # При повторе сначала пробуем другие экземпляры
+        candidates = [u for u in healthy if u not in exclude] or healthy
+        if not candidates:
+            return None
+        # Round-robin среди одинаково загруженных экземпляров
+        self._next += 1
+        least = min(upstream.in_flight for upstream in candidates)
+        candidates = [u for u in candidates if u.in_flight == least]
+        return candidates[self._next % len(candidates)]
+
+    def mark_failed(self, upstream: Upstream) -> None:
+        upstream.failures += 1
+        upstream.unhealthy_until = self.clock() + self.retry_after
+
+    def status(self) -> list[dict]:
+        now = self.clock()
+        return [
+            {
+                "url": upstream.url,
+                "healthy": upstream.unhealthy_until <= now,
+                "in_flight": upstream.in_flight,
+                "failures": upstream.failures,
+            }
+            for upstream in self.upstreams
+        ]
+
+
+@dataclass
+class ProxyRoute:
+    prefix: str
+    pool: UpstreamPool
+    # Проверять access-токен на шлюзе, до обращения к сервису
+    require_auth: bool = False
+
+
+def _unauthorized(detail: str) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=401,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class ReverseProxy:
+    # Проксирует запросы на экземпляры сервисов через общий httpx.AsyncClient:
+    # соединения с сервисами переиспользуются (keep-alive), тела запросов и
+    # ответов передаются потоком.
+    def __init__(
+        self,
+        routes: Sequence[ProxyRoute],
+        retries: int = 2,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.routes = list(routes)
+        self.retries = retries
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_settings(cls) -> "ReverseProxy":
+        retry_after = settings.PROXY_UPSTREAM_RETRY_SECONDS
+        return cls(
+            [
+                ProxyRoute(
+                    "/auth",
+                    UpstreamPool("auth", settings.AUTH_SERVICE_URLS, retry_after),
+                ),
+                ProxyRoute(
+                    "/api/users",
+                    UpstreamPool("users", settings.USER_SERVICE_URLS, retry_after),
+                    require_auth=True,
+                ),
+            ],
+            retries=settings.PROXY_RETRIES,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=settings.PROXY_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.PROXY_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.PROXY_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=httpx.Timeout(
+                    settings.PROXY_TIMEOUT_SECONDS,
+                    connect=settings.PROXY_CONNECT_TIMEOUT_SECONDS,
+                ),
+                follow_redirects=False,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def warm_up(self) -> None:
+        # Открывает соединения с экземплярами; каждому сервису нужен хотя бы
+        # один готовый экземпляр
+        for route in self.routes:
+            ready = 0
+            for upstream in route.pool.upstreams:
+                try:
+                    response = await self.client.get(f"{upstream.url}/ready")
+                except httpx.TransportError:
+                    route.pool.mark_failed(upstream)
+                    continue
+                if response.status_code == 200:
+                    ready += 1
+            if not ready:
+                raise RuntimeError(f"No ready upstream for {route.pool.name}")
+
+    def status(self) -> dict:
+        return {route.pool.name: route.pool.status() for route in self.routes}
+
+    def authenticate(self, request: Request) -> Optional[Response]:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return _unauthorized("Not authenticated")
+        try:
+            Auth.decode_access_token(token)
+        except (JWTError, ValueError):
+            log_sampled("INFO", "Rejected token at gateway for {}", request.url.path)
+            return _unauthorized("Invalid authentication credentials")
+        return None
+
+    @staticmethod
+    def _request_headers(request: Request) -> list[tuple[str, str]]:
+        headers = [
+            (name, value)
+            for name, value in request.headers.items()
+            if name not in HOP_BY_HOP_HEADERS
+            and name != "host"
+            and not name.startswith("x-forwarded-")
+        ]
+        # Цепочку X-Forwarded-For продолжаем только за доверенным прокси,
+        # иначе клиент мог бы подставить в нее произвольный адрес
+        client_host = request.client.host if request.client else None
+        forwarded_for = (
+            request.headers.get("x-forwarded-for")
+            if is_trusted_proxy(client_host)
+            else None
+        )
+        if client_host:
+            forwarded_for = (
+                f"{forwarded_for}, {client_host}" if forwarded_for else client_host
+            )
+        if forwarded_for:
+            headers.append(("x-forwarded-for", forwarded_for))
+        headers.append(("x-forwarded-proto", request.url.scheme))
+        if "host" in request.headers:
+            headers.append(("x-forwarded-host", request.headers["host"]))
+        return headers
+
+    async def forward(self, request: Request, route: ProxyRoute) -> Response:
+        if route.require_auth:
+            rejected = self.authenticate(request)
+            if rejected is not None:
+                return rejected
+
+        method = request.method
+        idempotent = method in IDEMPOTENT_METHODS
+        # Тело идемпотентного запроса буферизуется, чтобы его можно было
+        # отправить повторно; остальные тела передаются потоком
+        content = await request.body() if idempotent else request.stream()
+        headers = self._request_headers(request)
+        path = request.scope.get("raw_path", request.url.path.encode()).decode()
+        query = request.url.query
+
+        tried: list[Upstream] = []
+        for attempt in range(self.retries + 1):
+            upstream = route.pool.choose(exclude=tried)
+            if upstream is None:
+                break
+            tried.append(upstream)
+            url = f"{upstream.url}{path}" + (f"?{query}" if query else "")
+            upstream_request = self.client.build_request(
+                method, url, headers=headers, content=content
+            )
+            upstream.in_flight += 1
+            try:
+                response = await self.client.send(upstream_request, stream=True)
+            except httpx.TransportError as exc:
+                upstream.in_flight -= 1
+                if isinstance(exc, CONNECT_ERRORS):
+                    route.pool.mark_failed(upstream)
+                elif not idempotent:
+                    # Запрос мог дойти до сервиса: повтор небезопасен
+                    return JSONResponse({"detail": "Bad gateway"}, status_code=502)
+                log_sampled("WARNING", "Upstream {} failed: {!r}", upstream.url, exc)
+                continue
+
+            if (
+                idempotent
+                and response.status_code in RETRY_STATUSES
+                and attempt < self.retries
+            ):
+                await response.aclose()
+                upstream.in_flight -= 1
+                continue
+            return self._stream_response(response, upstream)
+
+        if tried:
+            return JSONResponse({"detail": "Bad gateway"}, status_code=502)
+        return JSONResponse({"detail": "Service unavailable"}, status_code=503)
+
+    @staticmethod
+    def _stream_response(response: httpx.Response, upstream: Upstream) -> Response:
+        async def release() -> None:
+            await response.aclose()
+            upstream.in_flight -= 1
+
+        proxied = StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            background=BackgroundTask(release),
+        )
+        # Список, а не dict: иначе потеряются повторяющиеся заголовки (Set-Cookie)
+        proxied.raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in response.headers.multi_items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        ]
+        return proxied
+
+
+def _forward_endpoint(proxy: ReverseProxy, route: ProxyRoute):
+    async def forward(request: Request) -> Response:
+        return await proxy.forward(request, route)
+
+    return forward
+
+
+def create_proxy_router(proxy: ReverseProxy) -> APIRouter:
+    router = APIRouter()
+    for route in proxy.routes:
+        router.add_api_route(
+            f"{route.prefix}/{{path:path}}",
+            _forward_endpoint(proxy, route),
+            methods=PROXY_METHODS,
+            include_in_schema=False,
+        )
+
+    @router.get("/metrics/upstreams", tags=["metrics"])
+    async def upstream_metrics():
+        return proxy.status()
+
+    return router
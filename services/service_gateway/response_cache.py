@@ -0,0 +1,226 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+from jose import JWTError
+
+from shared.core.cache import TTLCache
+from shared.core.config import settings
+from shared.core.etag import etag_matches
+from shared.core.security import Auth
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+@dataclass
+class CachedResponse:
+    etag: str
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class ResponseCache:
+    # Готовые тела ответов с ETag. Ключ включает Authorization: ответ
+    # зависит от того, кто спрашивает. Любая запись через шлюз сбрасывает
+    # весь кеш; записи через другие экземпляры шлюза ограничены ttl.
+    def __init__(self, max_size: int, ttl: float, max_body_size: int):
+        self.max_body_size = max_body_size
+        self._cache: TTLCache[tuple, CachedResponse] = TTLCache(max_size, ttl)
+        # Растет при каждой записи: ответ, начатый до записи, не сохраняется
+        self.generation = 0
+
+    @staticmethod
+    def key(scope) -> tuple:
+        authorization = b""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = hashlib.blake2b(value, digest_size=16).digest()
+                break
+        return scope["path"], scope["query_string"], authorization
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        return self._cache.get(key)
+
+    def put(
+        self,
+        key: tuple,
+        generation: int,
+        response: CachedResponse,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        # expires_at - unix-время (exp токена), запись не переживает токен
+        if generation != self.generation:
+            return
+        ttl = self._cache.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+            if ttl <= 0:
+                return
+        self._cache.set(key, response, expires_at=self._cache.clock() + ttl)
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "size": len(self._cache)}
+
+
+class ResponseCacheMiddleware:
+    # ASGI-middleware шлюза: GET с ETag под cache_prefixes отдаются из кеша
+    # (или 304 по If-None-Match) без обращения к сервису
+    def __init__(
+        self,
+        app,
+        cache: ResponseCache,
+        cache_prefixes: Sequence[str] = ("/api/users",),
+        # Выход и refresh могут отозвать токены (повторное использование
+        # refresh-токена отзывает все токены пользователя)
+        invalidate_prefixes: Sequence[str] = (
+            "/api/users",
+            "/auth/register",
+            "/auth/logout",
+            "/auth/refresh",
+        ),
+        # POST, который только читает (тело запроса слишком велико для GET)
+        read_only_paths: Sequence[str] = ("/api/users/lookup",),
+    ):
+        self.app = app
+        self.cache = cache
+        self.cache_prefixes = tuple(cache_prefixes)
+        self.invalidate_prefixes = tuple(invalidate_prefixes)
+        self.read_only_paths = frozenset(read_only_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        method = scope["method"]
+        if method not in SAFE_METHODS:
+            if (
+                path.startswith(self.invalidate_prefixes)
+                and path not in self.read_only_paths
+            ):
+                # До и после записи: чтение, начатое во время записи, не
+                # вернет в кеш старую версию
+                self.cache.invalidate()
+                try:
+                    await self.app(scope, receive, send)
+                finally:
+                    self.cache.invalidate()
+                return
+            await self.app(scope, receive, send)
+            return
+        if method != "GET" or not path.startswith(self.cache_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        # Токен проверяется и при попадании в кеш: отозванный или истекший
+        # токен не должен получать сохраненный ответ. Такой запрос уходит
+        # в сервис, который ответит 401 (этот ответ не кешируется)
+        expires_at = None
+        token = self._bearer_token(scope)
+        if token is not None:
+            try:
+                expires_at = Auth.decode_access_token(token).get("exp")
+            except (JWTError, ValueError):
+                await self.app(scope, receive, send)
+                return
+
+        key = self.cache.key(scope)
+        cached = self.cache.get(key)
+        if cached is not None:
+            await self._send_cached(scope, send, cached)
+            return
+
+        generation = self.cache.generation
+        start = None
+        chunks: list[bytes] | None = []
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal start, chunks, size
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body" and chunks is not None:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > self.cache.max_body_size:
+                    # Большие ответы не буферизуются
+                    chunks = None
+                else:
+                    chunks.append(body)
+                if chunks is not None and not message.get("more_body", False):
+                    self._store(key, generation, start, b"".join(chunks), expires_at)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _bearer_token(scope) -> Optional[str]:
+        # None - заголовка нет; "" - заголовок есть, но это не Bearer-токен
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                return token if scheme.lower() == "bearer" else ""
+        return None
+
+    def _store(
+        self,
+        key: tuple,
+        generation: int,
+        start,
+        body: bytes,
+        expires_at: Optional[float],
+    ) -> None:
+        if start["status"] != 200:
+            return
+        headers = list(start.get("headers", []))
+        etag = next((v for n, v in headers if n.lower() == b"etag"), None)
+        if etag is None:
+            # Кешируются только ответы, которые сервис пометил версией
+            return
+        self.cache.put(
+            key, generation, CachedResponse(etag.decode(), headers, body), expires_at
+        )
+
+    @staticmethod
+    async def _send_cached(scope, send, cached: CachedResponse) -> None:
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+                break
+        if etag_matches(if_none_match, cached.etag):
+            headers = [
+                (name, value)
+                for name, value in cached.headers
+                if name.lower() in (b"etag", b"cache-control", b"x-next-cursor")
+            ]
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": headers + [(b"x-cache", b"hit")],
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": cached.headers + [(b"x-cache", b"hit")],
+            }
+        )
+        await send({"type": "http.response.body", "body": cached.body})
+
+
+response_cache = ResponseCache(
+    max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    max_body_size=settings.RESPONSE_CACHE_MAX_BODY_BYTES,
+)
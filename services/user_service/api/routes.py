@@ -1,44 +1,226 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from shared.db.models import User, UserRole
-from shared.db.schemas.user import UserResponse, UserUpdate, UserUpdateFull
-from shared.db.session import get_db
+from shared.db.schemas.user import (
+    UserImportError,
+    UserImportResult,
+    UserLookupRequest,
+    UserLookupResponse,
+    UserResponse,
+    UserUpdate,
+    UserUpdateFull,
+)
+from shared.db.session import get_db, detached_session
+from services.user_service.serialization import (
+    RawJSONResponse,
+    render_lookup,
+    render_user,
+    render_users,
+)
 from services.user_service.service import UserService
+from shared.core.config import settings
+from shared.core.etag import etag_matches, not_modified, page_etag, set_etag, user_etag
+from shared.core.hashing import HashingError
 from shared.core.security import get_current_user_with_roles, auth
 from services.user_service.dependencies import get_user_service
-from shared.db.repositories.user_repository import UserRepository
+from shared.db.repositories.user_repository import (
+    UserAlreadyExistsError,
+    UserRepository,
+)
+from shared.db.pagination import InvalidCursorError
+from services.user_service.export import (
+    EXPORT_MEDIA_TYPES,
+    parse_export_fields,
+    render_csv,
+    render_ndjson,
+)
+from services.user_service.importer import (
+    read_import_records,
+    validate_import_records,
+)
 
 router = APIRouter(dependencies=[Depends(auth.get_current_user)])
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(current_user: User = Depends(auth.get_current_active_user)):
+async def get_current_user(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    etag = user_etag(current_user.id, current_user.version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return current_user
 
 
+@router.get("/export")
+async def export_users(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    fields: str | None = None,
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_with_roles(UserRole.ADMIN)),
+):
+    try:
+        selected_fields = parse_export_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def content():
+        async with detached_session(db) as session:
+            batches = UserRepository(session).stream_rows(selected_fields, batch_size)
+            if export_format == "csv":
+                chunks = render_csv(batches, selected_fields)
+            else:
+                chunks = render_ndjson(batches)
+            async for chunk in chunks:
+                yield chunk
+
+    return StreamingResponse(
+        content(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="users.{export_format}"'
+        },
+    )
+
+
+@router.post("/import", response_model=UserImportResult)
+async def import_users(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user_with_roles(UserRole.ADMIN)),
+):
+    try:
+        records = read_import_records(
+            await request.body(), request.headers.get("content-type", "")
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import body: {e}")
+    if len(records) > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many users, the limit is {settings.USER_IMPORT_MAX_ROWS}",
+        )
+
+    valid_users, failed = validate_import_records(records)
+    user_service = UserService(UserRepository(db))
+    try:
+        result = await user_service.import_users([user for _, user in valid_users])
+    except HashingError:
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    for conflict in result.conflicts:
+        failed.append(
+            UserImportError(
+                index=valid_users[conflict.index][0],
+                email=conflict.email,
+                username=conflict.username,
+                reason=conflict.reason,
+            )
+        )
+    failed.sort(key=lambda error: error.index)
+    return UserImportResult(created=len(result.created), failed=failed)
+
+
+@router.post("/lookup", response_model=UserLookupResponse)
+async def lookup_users(
+    lookup: UserLookupRequest,
+    current_user: User = Depends(get_current_user_with_roles(UserRole.ADMIN)),
+    user_service: UserService = Depends(get_user_service),
+):
+    # Пакетный поиск вместо GET /{user_id} на каждый ключ
+    if len(lookup.keys) > settings.USER_LOOKUP_MAX_KEYS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many keys, the limit is {settings.USER_LOOKUP_MAX_KEYS}",
+        )
+    users, missing = await user_service.lookup_users(lookup)
+    return RawJSONResponse(render_lookup(users, missing))
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user_with_roles(UserRole.ADMIN)),
     user_service: UserService = Depends(get_user_service),
 ):
-    user = await user_service.get_user_by_id(user_id)
-    if user is None:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Условный запрос проверяется по одной колонке version, без загрузки
+        # и сериализации пользователя
+        version = await user_service.get_user_version(user_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        etag = user_etag(user_id, version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    row = await user_service.get_user_row(user_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    response = RawJSONResponse(render_user(row))
+    set_etag(response, user_etag(row["id"], row["version"]))
+    return response
 
 
 @router.get("/", response_model=list[UserResponse])
 async def get_all_users(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    order_by: Literal["id", "username", "email"] = "id",
+    is_active: bool | None = None,
+    username_prefix: str | None = None,
+    role: Literal["admin", "manager", "user"] | None = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_with_roles(UserRole.ADMIN)),
 ):
     user_repository = UserRepository(db)
     user_service = UserService(user_repository)
-    users = await user_service.list_users(skip=skip, limit=limit)
-    return users
+    if skip:
+        # Старый режим с OFFSET оставлен для совместимости
+        return await user_service.list_users(skip=skip, limit=limit)
+
+    page = dict(
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        is_active=is_active,
+        username_prefix=username_prefix,
+        role=role,
+    )
+    if_none_match = request.headers.get("if-none-match")
+    try:
+        if if_none_match:
+            # Сначала сравниваем только (id, version) строк страницы
+            rows, next_cursor = await user_service.list_users_page_versions(**page)
+            etag = page_etag(rows, next_cursor)
+            if etag_matches(if_none_match, etag):
+                headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+                return not_modified(etag, headers)
+        # Строки колонок вместо ORM-объектов, страница сериализуется целиком
+        rows, next_cursor = await user_service.list_users_page_rows(**page)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = RawJSONResponse(render_users(rows))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    set_etag(
+        response, page_etag([(row["id"], row["version"]) for row in rows], next_cursor)
+    )
+    return response
 
 
 @router.put("/{user_id}", response_model=UserResponse)
@@ -50,7 +232,10 @@ async def update_user_full(
 ):
     user_repo = UserRepository(db)
     user_service = UserService(user_repo)
-    updated_user = await user_service.update_user_full(user_id, user_update)
+    try:
+        updated_user = await user_service.update_user_full(user_id, user_update)
+    except UserAlreadyExistsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
@@ -64,7 +249,10 @@ async def update_user_partial(
     current_user: User = Depends(get_current_user_with_roles(UserRole.ADMIN)),
 ):
     user_service = UserService(UserRepository(db))
-    updated_user = await user_service.update_user_partial(user_id, user_update)
+    try:
+        updated_user = await user_service.update_user_partial(user_id, user_update)
+    except UserAlreadyExistsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
     return updated_user
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from shared.db.repositories.user_repository import EXPORT_COLUMNS
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def parse_export_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(EXPORT_COLUMNS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in EXPORT_COLUMNS]
+    if unknown or not selected:
+        raise ValueError(f"Unknown export fields: {', '.join(unknown)}")
+    return selected
+
+
+async def render_ndjson(batches: AsyncIterator[list[dict]]) -> AsyncIterator[str]:
+    async for batch in batches:
+        yield "".join(
+            json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for row in batch
+        )
+
+
+async def render_csv(
+    batches: AsyncIterator[list[dict]], fields: list[str]
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for batch in batches:
+        for row in batch:
+            writer.writerow(
+                [
+                    ",".join(value) if isinstance(value, list) else value
+                    for value in (row[field] for field in fields)
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+
+from shared.db.schemas.user import UserCreate, UserImportError
+
+
+def read_import_records(body: bytes, content_type: str) -> list:
+    if content_type.startswith("text/csv"):
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        # Пустые ячейки означают значение по умолчанию
+        return [
+            {key: value for key, value in row.items() if value not in (None, "")}
+            for row in reader
+        ]
+    records = json.loads(body)
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of users")
+    return records
+
+
+def validate_import_records(
+    records: list,
+) -> tuple[list[tuple[int, UserCreate]], list[UserImportError]]:
+    users, errors = [], []
+    for index, record in enumerate(records):
+        try:
+            users.append((index, UserCreate.model_validate(record)))
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            errors.append(
+                UserImportError(
+                    index=index,
+                    email=record.get("email") if isinstance(record, dict) else None,
+                    username=record.get("username")
+                    if isinstance(record, dict)
+                    else None,
+                    reason=f"{location}: {error['msg']}" if location else error["msg"],
+                )
+            )
+    return users, errors
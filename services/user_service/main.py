@@ -0,0 +1,19 @@
+from fastapi import FastAPI
+from services.user_service.api.routes import router
+from shared.core.lifecycle import create_lifespan, readiness_endpoint
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="User Service", lifespan=create_lifespan())
+
+    app.include_router(router, prefix="/api/users", tags=["users"])
+    app.add_api_route("/ready", readiness_endpoint, tags=["health"])
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,29 @@
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from shared.db.schemas.user import UserLookupResponse, UserResponse
+
+# Адаптеры строятся один раз: валидация и сериализация всей страницы идут
+# одним вызовом в pydantic-core, без from_attributes по каждому объекту
+user_adapter = TypeAdapter(UserResponse)
+users_adapter = TypeAdapter(list[UserResponse])
+lookup_adapter = TypeAdapter(UserLookupResponse)
+
+
+class RawJSONResponse(Response):
+    # Тело уже сериализовано в JSON
+    media_type = "application/json"
+
+
+def render_user(row: dict) -> bytes:
+    return user_adapter.dump_json(user_adapter.validate_python(row))
+
+
+def render_users(rows: list[dict]) -> bytes:
+    return users_adapter.dump_json(users_adapter.validate_python(rows))
+
+
+def render_lookup(users: list, missing: list) -> bytes:
+    return lookup_adapter.dump_json(
+        lookup_adapter.validate_python({"users": users, "missing": missing})
+    )
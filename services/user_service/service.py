@@ -1,12 +1,15 @@
 # shared/services/user_service.py
-from shared.db.repositories.user_repository import UserRepository
+from shared.db.repositories.user_repository import BulkCreateResult, UserRepository
 from shared.db.models import User
 from shared.db.schemas.user import (
     UserCreate,
+    UserCreateInDB,
+    UserLookupRequest,
     UserUpdate,
     UserUpdateFull,
     UserUpdateInDB,
 )
+from shared.core.config import settings
 from shared.core.security import auth
 
 
@@ -15,30 +18,72 @@ class UserService:
         self.user_repository = user_repository
 
     async def create_user(self, user_data: UserCreate) -> User:
-        user = User(
+        user = UserCreateInDB(
             username=user_data.username,
             email=user_data.email,
-            hashed_password=auth.get_password_hash(user_data.password),
+            is_active=user_data.is_active,
+            roles=user_data.roles,
+            hashed_password=await auth.get_password_hash_async(user_data.password),
         )
         return await self.user_repository.create(user)
 
+    async def import_users(self, users: list[UserCreate]) -> BulkCreateResult:
+        # Пароли хешируются по чанку прямо перед его вставкой: при сбое или
+        # перегрузке хешера уже записанные чанки остаются закоммиченными
+        async def prepare(chunk: list[UserCreate]) -> list[UserCreateInDB]:
+            hashes = await auth.get_password_hashes_async(
+                [user.password for user in chunk]
+            )
+            return [
+                UserCreateInDB(
+                    username=user.username,
+                    email=user.email,
+                    is_active=user.is_active,
+                    roles=user.roles,
+                    hashed_password=hashed_password,
+                )
+                for user, hashed_password in zip(chunk, hashes)
+            ]
+
+        return await self.user_repository.bulk_create(
+            users, chunk_size=settings.USER_IMPORT_CHUNK_SIZE, prepare=prepare
+        )
+
     async def get_user_by_id(self, user_id: int) -> User | None:
         return await self.user_repository.get_by_id(user_id)
 
+    async def lookup_users(
+        self, lookup: UserLookupRequest
+    ) -> tuple[list[User], list[int | str]]:
+        # Повторяющиеся ключи ищутся и возвращаются один раз
+        keys = list(dict.fromkeys(lookup.keys))
+        chunk_size = settings.USER_LOOKUP_CHUNK_SIZE
+        if lookup.ids:
+            users = await self.user_repository.get_many_by_ids(keys, chunk_size)
+        elif lookup.usernames:
+            users = await self.user_repository.get_many_by_usernames(keys, chunk_size)
+        else:
+            users = await self.user_repository.get_many_by_emails(
+                keys, chunk_size=chunk_size
+            )
+        found = [user for user in users if user is not None]
+        missing = [key for key, user in zip(keys, users) if user is None]
+        return found, missing
+
+    async def get_user_row(self, user_id: int) -> dict | None:
+        return await self.user_repository.get_row(user_id)
+
+    async def get_user_version(self, user_id: int) -> int | None:
+        return await self.user_repository.get_version(user_id)
+
     async def update_user_partial(
         self, user_id: int, user_data: UserUpdateInDB
     ) -> User | None:
-        current_user = await self.user_repository.get_by_id(user_id)
-        if not current_user:
-            return None
         return await self.user_repository.update(user_id, user_data)
 
     async def update_user_full(
         self, user_id: int, user_data: UserUpdateFull
     ) -> User | None:
-        current_user = await self.user_repository.get_by_id(user_id)
-        if not current_user:
-            return None
         update_data = UserUpdateInDB(**user_data.model_dump())
         return await self.user_repository.update(user_id, update_data, full_update=True)
 
@@ -47,3 +92,57 @@ class UserService:
 
     async def list_users(self, skip: int = 0, limit: int = 100) -> list[User]:
         return await self.user_repository.list(skip, limit)
+
+    async def list_users_page(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        is_active: bool | None = None,
+        username_prefix: str | None = None,
+        role: str | None = None,
+    ) -> tuple[list[User], str | None]:
+        return await self.user_repository.list_page(
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            is_active=is_active,
+            username_prefix=username_prefix,
+            role=role,
+        )
+
+    async def list_users_page_rows(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        is_active: bool | None = None,
+        username_prefix: str | None = None,
+        role: str | None = None,
+    ) -> tuple[list[dict], str | None]:
+        return await self.user_repository.list_page_rows(
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            is_active=is_active,
+            username_prefix=username_prefix,
+            role=role,
+        )
+
+    async def list_users_page_versions(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        is_active: bool | None = None,
+        username_prefix: str | None = None,
+        role: str | None = None,
+    ) -> tuple[list[tuple[int, int]], str | None]:
+        return await self.user_repository.list_page_versions(
+            limit=limit,
+            cursor=cursor,
+            order_by=order_by,
+            is_active=is_active,
+            username_prefix=username_prefix,
+            role=role,
+        )
@@ -0,0 +1,93 @@
+"""Подбор стоимости хеширования паролей под целевую задержку.
+
+Запуск: python -m shared.core.calibrate_hashing --target-ms 250
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from shared.core.hashing import build_context
+
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure(context_factory: Callable, samples: int) -> float:
+    # Медиана нескольких замеров одного хеширования, в миллисекундах
+    context = context_factory()
+    context.hash(SAMPLE_PASSWORD)  # прогрев
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def calibrate_bcrypt(target_ms: float, samples: int = 3) -> tuple[int, float]:
+    # Каждый раунд bcrypt удваивает стоимость: берем максимальное число
+    # раундов, которое укладывается в целевую задержку
+    best = (4, measure(lambda: build_context(["bcrypt"], bcrypt_rounds=4), samples))
+    for rounds in range(5, 32):
+        latency = measure(
+            lambda: build_context(["bcrypt"], bcrypt_rounds=rounds), samples
+        )
+        if latency > target_ms:
+            break
+        best = (rounds, latency)
+    return best
+
+
+def calibrate_argon2(
+    target_ms: float, memory_cost: int, parallelism: int, samples: int = 3
+) -> tuple[int, float]:
+    # Память фиксирована, подбирается число проходов (time_cost)
+    def factory(time_cost: int) -> Callable:
+        return lambda: build_context(
+            ["argon2"],
+            argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_cost,
+            argon2_parallelism=parallelism,
+        )
+
+    best = (1, measure(factory(1), samples))
+    for time_cost in range(2, 65):
+        latency = measure(factory(time_cost), samples)
+        if latency > target_ms:
+            break
+        best = (time_cost, latency)
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--argon2-memory-cost", type=int, default=65536)
+    parser.add_argument("--argon2-parallelism", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.scheme == "bcrypt":
+        rounds, latency = calibrate_bcrypt(args.target_ms, args.samples)
+        print(f"# bcrypt: {latency:.1f} ms per hash")
+        print("PASSWORD_SCHEMES='[\"bcrypt\"]'")
+        print(f"BCRYPT_ROUNDS={rounds}")
+    else:
+        time_cost, latency = calibrate_argon2(
+            args.target_ms,
+            args.argon2_memory_cost,
+            args.argon2_parallelism,
+            args.samples,
+        )
+        print(f"# argon2: {latency:.1f} ms per hash")
+        # bcrypt остается во втором списке, чтобы старые хеши обновлялись при входе
+        print('PASSWORD_SCHEMES=\'["argon2", "bcrypt"]\'')
+        print(f"ARGON2_TIME_COST={time_cost}")
+        print(f"ARGON2_MEMORY_COST={args.argon2_memory_cost}")
+        print(f"ARGON2_PARALLELISM={args.argon2_parallelism}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import ipaddress
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from fastapi import Request
+
+from shared.core.config import settings
+
+Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+@lru_cache(maxsize=8)
+def _networks(proxies: tuple[str, ...]) -> tuple[Network, ...]:
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted(host: str, networks: Sequence[Network]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def is_trusted_proxy(host: Optional[str]) -> bool:
+    networks = _networks(tuple(settings.TRUSTED_PROXIES))
+    return host is not None and _is_trusted(host, networks)
+
+
+def client_ip(request: Request) -> Optional[str]:
+    # Адрес клиента за доверенными прокси (TRUSTED_PROXIES, например шлюз в
+    # режиме proxy). X-Forwarded-For читается справа налево и только если
+    # соединение пришло от доверенного прокси: левые элементы задает клиент
+    # и подделать их может кто угодно.
+    peer = request.client.host if request.client else None
+    if not is_trusted_proxy(peer):
+        return peer
+    networks = _networks(tuple(settings.TRUSTED_PROXIES))
+    forwarded = [
+        host.strip()
+        for host in request.headers.get("x-forwarded-for", "").split(",")
+        if host.strip()
+    ]
+    for host in reversed(forwarded):
+        if not _is_trusted(host, networks):
+            return host
+    return forwarded[0] if forwarded else peer
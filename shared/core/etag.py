@@ -0,0 +1,49 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response
+
+# Клиент может хранить ответ, но перед использованием перепроверяет ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    # Сильный ETag: меняется вместе с любой версией, из которой собран ответ
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def user_etag(user_id: int, version: int) -> str:
+    return make_etag("user", user_id, version)
+
+
+def page_etag(rows: list[tuple[int, int]], next_cursor: Optional[str]) -> str:
+    return make_etag(
+        "users", *(f"{id_}.{version}" for id_, version in rows), next_cursor
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, **(headers or {})},
+    )
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
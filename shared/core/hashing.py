@@ -0,0 +1,236 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable
+
+from passlib.context import CryptContext
+
+from shared.core.config import settings
+from shared.core.metrics import password_hashing_duration_seconds
+
+
+def build_context(
+    schemes: list[str],
+    bcrypt_rounds: int = 12,
+    argon2_time_cost: int = 3,
+    argon2_memory_cost: int = 65536,
+    argon2_parallelism: int = 4,
+) -> CryptContext:
+    # Хеши по устаревшим схемам и с другой стоимостью требуют обновления
+    # (needs_update), поэтому смена настроек не ломает существующие пароли
+    options: dict = {"schemes": schemes, "deprecated": "auto"}
+    if "bcrypt" in schemes:
+        options.update(
+            bcrypt__rounds=bcrypt_rounds,
+            bcrypt__min_rounds=bcrypt_rounds,
+            bcrypt__max_rounds=bcrypt_rounds,
+        )
+    if "argon2" in schemes:
+        # Требует пакет argon2-cffi
+        options.update(
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    return CryptContext(**options)
+
+
+pwd_context = build_context(
+    settings.PASSWORD_SCHEMES,
+    bcrypt_rounds=settings.BCRYPT_ROUNDS,
+    argon2_time_cost=settings.ARGON2_TIME_COST,
+    argon2_memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.ARGON2_PARALLELISM,
+)
+
+
+# Функции верхнего уровня, чтобы их можно было передать в дочерний процесс
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _verify_and_update(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    # Проверка и перехеширование в одном обращении к пулу
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _warm_up() -> int:
+    # Первый хеш загружает backend passlib в процессе пула
+    pwd_context.hash("warm-up")
+    return os.getpid()
+
+
+class HashingError(RuntimeError):
+    pass
+
+
+class HashingQueueFullError(HashingError):
+    pass
+
+
+class HashingTimeoutError(HashingError):
+    pass
+
+
+@dataclass
+class HashingStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["avg_latency"] = (
+            self.total_latency / self.completed if self.completed else 0.0
+        )
+        return data
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        timeout: float,
+        pool_kind: str = "process",
+    ):
+        if pool_kind not in ("process", "thread"):
+            raise ValueError(f"Unknown hashing pool kind: {pool_kind}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.pool_kind = pool_kind
+        self._executor: Executor | None = None
+        self._stats = HashingStats()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.pool_kind == "process":
+                # spawn: не наследуем потоки и соединения родительского процесса
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="hashing"
+                )
+        return self._executor
+
+    async def _submit(
+        self, operation: str, func: Callable[..., Any], *args: Any
+    ) -> Any:
+        stats = self._stats
+        if stats.queue_depth >= self.queue_size:
+            stats.rejected += 1
+            raise HashingQueueFullError("Password hashing queue is full")
+
+        stats.submitted += 1
+        stats.queue_depth += 1
+        stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            stats.queue_depth -= 1
+            stats.failed += 1
+            raise
+        # Место в очереди освобождается, когда задача закончилась в пуле,
+        # а не когда ожидающий сдался по таймауту
+        future.add_done_callback(lambda _: self._release_slot(loop))
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            stats.timed_out += 1
+            raise HashingTimeoutError("Password hashing timed out")
+        except Exception:
+            stats.failed += 1
+            raise
+
+        latency = time.perf_counter() - started
+        password_hashing_duration_seconds.observe(latency, operation)
+        stats.completed += 1
+        stats.total_latency += latency
+        stats.max_latency = max(stats.max_latency, latency)
+        return result
+
+    def _release_slot(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Вызывается из потока пула: счетчик меняется в потоке event loop
+        try:
+            loop.call_soon_threadsafe(self._decrement_queue_depth)
+        except RuntimeError:
+            # Loop уже закрыт
+            self._decrement_queue_depth()
+
+    def _decrement_queue_depth(self) -> None:
+        self._stats.queue_depth -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", _hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(
+            "verify", _verify_password, plain_password, hashed_password
+        )
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._submit(
+            "verify", _verify_and_update, plain_password, hashed_password
+        )
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        # Массовое хеширование занимает не больше половины очереди,
+        # чтобы логины во время импорта не получали отказ
+        window = max(1, min(self.queue_size // 2, self.workers * 2))
+        hashes: list[str] = []
+        for start in range(0, len(passwords), window):
+            chunk = passwords[start : start + window]
+            hashes.extend(await asyncio.gather(*(self.hash(p) for p in chunk)))
+        return hashes
+
+    async def warm_up(self) -> int:
+        # По задаче на каждый worker: пул запускает все процессы сразу, и первые
+        # входы не платят за spawn и импорт модулей. Возвращает число процессов
+        # (для пула потоков - 1).
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        pids = await asyncio.gather(
+            *(loop.run_in_executor(executor, _warm_up) for _ in range(self.workers))
+        )
+        return len(set(pids))
+
+    def stats(self) -> dict:
+        return self._stats.as_dict()
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.HASHING_POOL_WORKERS,
+    queue_size=settings.HASHING_QUEUE_SIZE,
+    timeout=settings.HASHING_TIMEOUT_SECONDS,
+    pool_kind=settings.HASHING_POOL_KIND,
+)
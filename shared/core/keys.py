@@ -0,0 +1,200 @@
+import base64
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from jose.backends.base import Key
+
+from shared.core.config import settings
+from shared.core.log import logger
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"}
+
+_EC_CURVES = {
+    "ES256": ec.SECP256R1,
+    "ES384": ec.SECP384R1,
+    "ES512": ec.SECP521R1,
+}
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return algorithm in ASYMMETRIC_ALGORITHMS
+
+
+@dataclass
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: Key
+    public_key: Key
+    # С какого момента ключ используется для подписи
+    not_before: float
+    # Когда ключ перестал использоваться для подписи (None - еще используется)
+    retired_at: Optional[float] = None
+
+    def public_jwk(self) -> dict:
+        data = self.public_key.to_dict()
+        data.update({"kid": self.kid, "use": "sig"})
+        return data
+
+
+def _generate_private_pem(algorithm: str) -> bytes:
+    if algorithm.startswith("ES"):
+        private_key = ec.generate_private_key(_EC_CURVES[algorithm]())
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+class KeyRing:
+    # Набор ключей подписи. Новый ключ публикуется в JWKS заранее
+    # (publish_ahead) и начинает использоваться для подписи позже, старые
+    # ключи остаются доступными для проверки еще retention секунд.
+    def __init__(
+        self,
+        algorithm: str,
+        rotation_interval: float,
+        publish_ahead: float,
+        retention: float,
+        keys_dir: Optional[str] = None,
+    ):
+        self.algorithm = algorithm
+        self.rotation_interval = rotation_interval
+        self.publish_ahead = publish_ahead
+        self.retention = retention
+        self.keys_dir = Path(keys_dir) if keys_dir else None
+        self._keys: dict[str, SigningKey] = {}
+        self._loaded = False
+        self._last_reload = 0.0
+
+    def _make_key(self, private_pem: bytes, not_before: float) -> SigningKey:
+        private_key = jwk.construct(private_pem, self.algorithm)
+        public_key = private_key.public_key()
+        der = public_key.prepared_key.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        kid = base64.urlsafe_b64encode(hashlib.sha256(der).digest()[:16])
+        return SigningKey(
+            kid=kid.decode().rstrip("="),
+            algorithm=self.algorithm,
+            private_key=private_key,
+            public_key=public_key,
+            not_before=not_before,
+        )
+
+    def load(self) -> None:
+        self._loaded = True
+        if self.keys_dir is None or not self.keys_dir.is_dir():
+            return
+        for path in sorted(self.keys_dir.glob("*.pem")):
+            key = self._make_key(path.read_bytes(), path.stat().st_mtime)
+            self._keys.setdefault(key.kid, key)
+        self._retire_superseded(time.time())
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def add_key(self, not_before: Optional[float] = None) -> SigningKey:
+        self._ensure_loaded()
+        now = time.time()
+        not_before = now if not_before is None else not_before
+        private_pem = _generate_private_pem(self.algorithm)
+        key = self._make_key(private_pem, not_before)
+        if self.keys_dir is not None:
+            self.keys_dir.mkdir(parents=True, exist_ok=True)
+            path = self.keys_dir / f"{key.kid}.pem"
+            path.write_bytes(private_pem)
+            os.chmod(path, 0o600)
+            os.utime(path, (not_before, not_before))
+        else:
+            logger.warning(
+                "JWT_KEYS_DIR is not set, signing key {} lives only in this process",
+                key.kid,
+            )
+        self._keys[key.kid] = key
+        return key
+
+    def _retire_superseded(self, now: float) -> None:
+        active = [key for key in self._keys.values() if key.not_before <= now]
+        if not active:
+            return
+        newest = max(active, key=lambda key: key.not_before)
+        for key in active:
+            if key is not newest and key.retired_at is None:
+                key.retired_at = newest.not_before
+
+    def _prune(self, now: float) -> None:
+        for kid, key in list(self._keys.items()):
+            if key.retired_at is not None and key.retired_at + self.retention < now:
+                del self._keys[kid]
+                if self.keys_dir is not None:
+                    (self.keys_dir / f"{kid}.pem").unlink(missing_ok=True)
+
+    def rotate(self) -> SigningKey:
+        # Следующий ключ сначала публикуется и только потом подписывает токены
+        return self.add_key(not_before=time.time() + self.publish_ahead)
+
+    def maybe_rotate(self) -> None:
+        self._ensure_loaded()
+        now = time.time()
+        if not self._keys:
+            self.add_key(not_before=now)
+            return
+        newest = max(self._keys.values(), key=lambda key: key.not_before)
+        if newest.not_before + self.rotation_interval - self.publish_ahead <= now:
+            if self.keys_dir is not None:
+                # Ключ мог уже сгенерировать другой процесс
+                self.load()
+                newest = max(self._keys.values(), key=lambda key: key.not_before)
+            if newest.not_before + self.rotation_interval - self.publish_ahead <= now:
+                self.rotate()
+        self._retire_superseded(now)
+        self._prune(now)
+
+    def signing_key(self) -> SigningKey:
+        self.maybe_rotate()
+        now = time.time()
+        active = [key for key in self._keys.values() if key.not_before <= now]
+        if not active:
+            # Есть только опубликованные заранее ключи
+            return min(self._keys.values(), key=lambda key: key.not_before)
+        return max(active, key=lambda key: key.not_before)
+
+    def get(self, kid: str) -> Optional[SigningKey]:
+        self._ensure_loaded()
+        key = self._keys.get(kid)
+        now = time.time()
+        if key is None and self.keys_dir is not None and now - self._last_reload > 5:
+            # Ключ мог появиться после ротации в другом процессе
+            self._last_reload = now
+            self.load()
+            key = self._keys.get(kid)
+        return key
+
+    def jwks(self) -> dict:
+        self.maybe_rotate()
+        return {"keys": [key.public_jwk() for key in self._keys.values()]}
+
+
+keyring = KeyRing(
+    algorithm=settings.ALGORITHM,
+    rotation_interval=settings.JWT_KEY_ROTATION_HOURS * 3600,
+    publish_ahead=settings.JWT_KEY_PUBLISH_AHEAD_MINUTES * 60,
+    retention=max(
+        settings.ACCESS_TOKEN_EXPIRE_MINUTES, settings.REFRESH_TOKEN_EXPIRE_MINUTES
+    )
+    * 60,
+    keys_dir=settings.JWT_KEYS_DIR,
+)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from shared.core.config import settings
+from shared.core.hashing import password_hasher
+from shared.core.keys import is_asymmetric, keyring
+from shared.core.log import logger, setup_logging, shutdown_logging
+from shared.core.security import Auth
+from shared.db.database import Base, engines
+from shared.db.repositories.refresh_token_repository import RefreshTokenRepository
+from shared.db.session import get_session_factory
+
+
+class Readiness:
+    # Состояние прогрева процесса: ready выставляется только после того,
+    # как все шаги прошли успешно
+    def __init__(self):
+        self.ready = False
+        self.checks: dict[str, str] = {}
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "checks": dict(self.checks),
+        }
+
+
+async def warm_up_database(create_tables: bool = False) -> None:
+    if create_tables:
+        async with engines.primary.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    await engines.warm_up(settings.DB_WARMUP_CONNECTIONS)
+
+
+async def warm_up_signing_keys() -> None:
+    # Загружаем ключи с диска и проверяем цепочку encode/decode
+    if is_asymmetric(settings.ALGORITHM):
+        keyring.maybe_rotate()
+    token = Auth.encode_token({"sub": "warm-up", "exp": int(time.time()) + 60})
+    Auth._verify_token(token)
+
+
+async def warm_up_hashing() -> None:
+    await password_hasher.warm_up()
+
+
+Step = tuple[str, Callable[[], Awaitable[None]]]
+
+
+def service_steps(create_tables: bool = False) -> list[Step]:
+    # Прогрев процесса, который сам обслуживает запросы к БД
+    return [
+        ("database", lambda: warm_up_database(create_tables)),
+        ("signing_keys", warm_up_signing_keys),
+        ("hashing", warm_up_hashing),
+    ]
+
+
+async def cleanup_refresh_tokens(session_factory=None) -> int:
+    # Истекшие refresh-токены (в том числе обмененные) больше не нужны
+    # даже для обнаружения повторного использования
+    session_factory = session_factory or get_session_factory()
+    async with session_factory() as session:
+        deleted = await RefreshTokenRepository(session).delete_expired(
+            datetime.now(timezone.utc)
+        )
+    logger.info("Deleted {} expired refresh tokens", deleted)
+    return deleted
+
+
+Job = tuple[str, float, Callable[[], Awaitable[Any]]]
+
+
+def service_jobs() -> list[Job]:
+    # Периодические задачи процесса, который обслуживает /auth
+    jobs: list[Job] = []
+    if settings.REFRESH_TOKEN_CLEANUP_INTERVAL_SECONDS > 0:
+        jobs.append(
+            (
+                "refresh_token_cleanup",
+                settings.REFRESH_TOKEN_CLEANUP_INTERVAL_SECONDS,
+                cleanup_refresh_tokens,
+            )
+        )
+    return jobs
+
+
+async def run_periodically(name: str, interval: float, job) -> None:
+    # Ошибка одного запуска не останавливает задачу
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception as exc:
+            logger.warning("Periodic job {} failed: {!r}", name, exc)
+
+
+async def warm_up(readiness: Readiness, steps: list[Step]) -> None:
+    for name, _ in steps:
+        readiness.checks[name] = "pending"
+    for name, step in steps:
+        # Шаг повторяется, пока не пройдет: до этого процесс не готов
+        while True:
+            started = time.perf_counter()
+            try:
+                await step()
+            except Exception as exc:
+                readiness.checks[name] = f"error: {type(exc).__name__}"
+                logger.warning("Warm-up step {} failed: {!r}", name, exc)
+                await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+                continue
+            readiness.checks[name] = "ok"
+            logger.info(
+                "Warm-up step {} done in {:.3f}s", name, time.perf_counter() - started
+            )
+            break
+    readiness.ready = True
+
+
+def create_lifespan(
+    steps: Optional[list[Step]] = None,
+    on_shutdown: Optional[Callable[[], Awaitable[None]]] = None,
+    jobs: Optional[list[Job]] = None,
+):
+    if steps is None:
+        steps = service_steps()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        setup_logging()
+        engines.start()
+        readiness = Readiness()
+        app.state.readiness = readiness
+        # Прогрев идет в фоне: сервер уже принимает запросы, но /ready
+        # отвечает 503, пока прогрев не закончится
+        tasks = [asyncio.create_task(warm_up(readiness, steps))]
+        tasks.extend(
+            asyncio.create_task(run_periodically(name, interval, job))
+            for name, interval, job in jobs or []
+        )
+        try:
+            yield
+        finally:
+            readiness.ready = False
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                with suppress(asyncio.CancelledError):
+                    await task
+            if on_shutdown is not None:
+                await on_shutdown()
+            # Останавливаем пул хеширования паролей и закрываем соединения
+            password_hasher.shutdown()
+            await engines.dispose()
+            await shutdown_logging()
+
+    return lifespan
+
+
+async def readiness_endpoint(request: Request) -> JSONResponse:
+    readiness: Readiness | None = getattr(request.app.state, "readiness", None)
+    if readiness is None:
+        readiness = Readiness()
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
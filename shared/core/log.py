@@ -0,0 +1,100 @@
+import re
+import sys
+from typing import Any
+
+from loguru import logger as _logger
+
+from shared.core.config import settings
+
+# Поля extra, значения которых никогда не попадают в лог
+SECRET_FIELDS = frozenset(
+    {
+        "password",
+        "plain_password",
+        "hashed_password",
+        "token",
+        "access_token",
+        "refresh_token",
+        "authorization",
+        "secret",
+        "secret_key",
+    }
+)
+REDACTED = "***"
+
+_SECRET_PAIR = re.compile(
+    r"(?i)\b(password|passwd|secret|token|authorization)(\s*[=:]\s*)([^\s,;]+)"
+)
+_JWT = re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]+")
+_BCRYPT_HASH = re.compile(r"\$2[aby]?\$\d{2}\$[./\w]{53}")
+
+
+def redact(text: str) -> str:
+    text = _SECRET_PAIR.sub(lambda m: f"{m.group(1)}{m.group(2)}{REDACTED}", text)
+    text = _JWT.sub(REDACTED, text)
+    return _BCRYPT_HASH.sub(REDACTED, text)
+
+
+def redact_record(record: dict) -> None:
+    record["message"] = redact(record["message"])
+    extra = record["extra"]
+    for key in extra:
+        if key.lower() in SECRET_FIELDS:
+            extra[key] = REDACTED
+
+
+# Логгер приложения: секреты вырезаются на любом sink, даже без setup_logging.
+# Сообщения пишутся в стиле logger.info("user {}", user_id): форматирование
+# откладывается и не выполняется, если уровень отключен.
+logger = _logger.patch(redact_record)
+
+
+class Sampler:
+    # Для каждого места вызова (ключа) пропускает первое событие и затем
+    # каждое every-е. Ключ - шаблон сообщения, поэтому ключей немного.
+    def __init__(self, every: int):
+        self.every = max(1, every)
+        self._counts: dict[str, int] = {}
+
+    def should_log(self, site: str) -> tuple[bool, int]:
+        # Возвращает (писать ли событие, сколько событий пропущено перед ним)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1
+        if count % self.every:
+            return False, 0
+        return True, self.every - 1 if count else 0
+
+    def clear(self) -> None:
+        self._counts.clear()
+
+
+sampler = Sampler(settings.LOG_SAMPLE_EVERY)
+
+
+def log_sampled(level: str, message: str, *args: Any, **kwargs: Any) -> None:
+    # Для частых событий (отказы в доступе, неверные токены): первое событие
+    # и затем каждое N-е, с числом пропущенных в extra
+    emit, suppressed = sampler.should_log(message)
+    if emit:
+        logger.opt(depth=1).bind(suppressed=suppressed).log(
+            level, message, *args, **kwargs
+        )
+
+
+def setup_logging() -> None:
+    # enqueue=True: запись в sink идет из фонового потока через очередь,
+    # event loop только кладет запись в очередь
+    _logger.remove()
+    _logger.add(
+        sys.stderr,
+        level=settings.LOG_LEVEL,
+        enqueue=settings.LOG_ENQUEUE,
+        serialize=settings.LOG_SERIALIZE,
+        backtrace=False,
+        diagnose=False,
+    )
+
+
+async def shutdown_logging() -> None:
+    # Дожидаемся, пока фоновый поток допишет очередь
+    await _logger.complete()
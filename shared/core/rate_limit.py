@@ -0,0 +1,168 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from shared.core.config import settings
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded: {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    limit: int
+    window: float
+
+
+class RateLimitBackend(ABC):
+    # Хранилище счетчиков. hit учитывает запрос и возвращает None, если он
+    # разрешен, иначе - через сколько секунд стоит повторить попытку.
+    # peek отвечает так же, но ничего не учитывает.
+    @abstractmethod
+    async def hit(self, key: str, rate: RateLimit) -> Optional[float]: ...
+
+    @abstractmethod
+    async def peek(self, key: str, rate: RateLimit) -> Optional[float]: ...
+
+    @abstractmethod
+    async def reset(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    # Скользящее окно по двум соседним фиксированным окнам: на ключ хранится
+    # только (начало окна, счетчик прошлого окна, счетчик текущего окна).
+    # Число ключей ограничено, самые давние вытесняются первыми.
+    def __init__(self, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._counters: OrderedDict[str, tuple[float, int, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def _current(self, key: str, rate: RateLimit) -> tuple[float, int, int, float]:
+        # (начало окна, прошлое окно, текущее окно, через сколько повторить
+        # или 0, если запрос укладывается в лимит)
+        now = self.clock()
+        window_start = now - now % rate.window
+        started, previous, current = self._counters.get(key, (window_start, 0, 0))
+        if started != window_start:
+            # Прошлым окном считается только непосредственно предыдущее
+            previous = current if window_start - started == rate.window else 0
+            current = 0
+
+        elapsed = now - window_start
+        estimate = previous * (1 - elapsed / rate.window) + current
+        retry_after = rate.window - elapsed if estimate >= rate.limit else 0.0
+        return window_start, previous, current, retry_after
+
+    async def hit(self, key: str, rate: RateLimit) -> Optional[float]:
+        window_start, previous, current, retry_after = self._current(key, rate)
+        if retry_after:
+            self._store(key, (window_start, previous, current))
+            return retry_after
+        self._store(key, (window_start, previous, current + 1))
+        return None
+
+    async def peek(self, key: str, rate: RateLimit) -> Optional[float]:
+        retry_after = self._current(key, rate)[3]
+        return retry_after or None
+
+    def _store(self, key: str, counter: tuple[float, int, int]) -> None:
+        self._counters[key] = counter
+        self._counters.move_to_end(key)
+        while len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+
+    async def reset(self, key: str) -> None:
+        self._counters.pop(key, None)
+
+    async def clear(self) -> None:
+        self._counters.clear()
+
+
+_BACKENDS: dict[str, Callable[[], RateLimitBackend]] = {
+    "memory": lambda: InMemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS),
+}
+
+
+def register_backend(name: str, factory: Callable[[], RateLimitBackend]) -> None:
+    _BACKENDS[name] = factory
+
+
+def create_backend(name: str) -> RateLimitBackend:
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown rate limit backend: {name}")
+    return _BACKENDS[name]()
+
+
+class LoginRateLimiter:
+    # Проверяется до поиска пользователя и bcrypt: сначала по IP и по
+    # учетной записи, затем глобальный лимит. Глобальный лимит учитывает
+    # только попытки, прошедшие остальные проверки: иначе один IP, упершийся
+    # в свой лимит, израсходовал бы общий и закрыл вход всем.
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        per_account: RateLimit,
+        per_ip: RateLimit,
+        global_rate: RateLimit,
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.per_account = per_account
+        self.per_ip = per_ip
+        self.global_rate = global_rate
+        self.enabled = enabled
+
+    async def check(self, username: str, ip: Optional[str]) -> None:
+        if not self.enabled:
+            return
+        # При исчерпанном глобальном лимите попытка отклоняется, не
+        # расходуя лимиты IP и учетной записи
+        retry_after = await self.backend.peek("login:global", self.global_rate)
+        if retry_after is not None:
+            raise RateLimitExceeded("global", retry_after)
+
+        checks = []
+        if ip:
+            checks.append(("ip", f"login:ip:{ip}", self.per_ip))
+        checks.append(
+            ("account", f"login:account:{username.lower()}", self.per_account)
+        )
+        checks.append(("global", "login:global", self.global_rate))
+        for scope, key, rate in checks:
+            retry_after = await self.backend.hit(key, rate)
+            if retry_after is not None:
+                raise RateLimitExceeded(scope, retry_after)
+
+    async def reset_account(self, username: str) -> None:
+        # После успешного входа неудачные попытки не должны накапливаться
+        await self.backend.reset(f"login:account:{username.lower()}")
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+
+login_rate_limiter = LoginRateLimiter(
+    backend=create_backend(settings.RATE_LIMIT_BACKEND),
+    per_account=RateLimit(
+        settings.LOGIN_RATE_LIMIT_PER_ACCOUNT, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+    ),
+    per_ip=RateLimit(
+        settings.LOGIN_RATE_LIMIT_PER_IP, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+    ),
+    global_rate=RateLimit(
+        settings.LOGIN_RATE_LIMIT_GLOBAL, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+    ),
+    enabled=settings.LOGIN_RATE_LIMIT_ENABLED,
+)
@@ -1,8 +1,7 @@
+import time
 from typing import Optional
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
 from jose import jwt, JWTError
-from loguru import logger
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -10,27 +9,92 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from shared.db.session import get_db
 from shared.db.repositories.user_repository import UserRepository
-from shared.db.models import User, UserRole
+from shared.db.models import User, UserRole, roles_to_mask
 from shared.core.config import settings
+from shared.core.hashing import password_hasher, pwd_context
+from shared.core.keys import is_asymmetric, keyring
+from shared.core.log import log_sampled
+from shared.core.metrics import (
+    jwt_duration_seconds,
+    password_hashing_duration_seconds,
+)
+from shared.core.token_cache import token_memo
+from shared.core.user_versions import user_versions
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class Auth:
+    @staticmethod
+    def encode_token(claims: dict) -> str:
+        started = time.perf_counter()
+        if is_asymmetric(settings.ALGORITHM):
+            key = keyring.signing_key()
+            token = jwt.encode(
+                claims,
+                key.private_key,
+                algorithm=settings.ALGORITHM,
+                headers={"kid": key.kid},
+            )
+        else:
+            token = jwt.encode(
+                claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+            )
+        jwt_duration_seconds.observe(time.perf_counter() - started, "encode")
+        return token
+
+    @staticmethod
+    def _verify_token(token: str) -> dict:
+        started = time.perf_counter()
+        try:
+            if is_asymmetric(settings.ALGORITHM):
+                kid = jwt.get_unverified_header(token).get("kid")
+                key = keyring.get(kid) if isinstance(kid, str) else None
+                if key is None:
+                    raise JWTError("Unknown signing key")
+                return jwt.decode(
+                    token, key.public_key, algorithms=[settings.ALGORITHM]
+                )
+            return jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+        finally:
+            jwt_duration_seconds.observe(time.perf_counter() - started, "decode")
+
     @staticmethod
     def get_password_hash(password: str) -> str:
-        return pwd_context.hash(password)
+        started = time.perf_counter()
+        hashed = pwd_context.hash(password)
+        password_hashing_duration_seconds.observe(time.perf_counter() - started, "hash")
+        return hashed
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
+        started = time.perf_counter()
         result = pwd_context.verify(plain_password, hashed_password)
-        logger.debug(f"Password verification result: {result}")
-        logger.debug(f"Plain password: {plain_password}")
-        logger.debug(f"Hashed password: {hashed_password}")
+        password_hashing_duration_seconds.observe(
+            time.perf_counter() - started, "verify"
+        )
         return result
 
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        return await password_hasher.hash(password)
+
+    @staticmethod
+    async def get_password_hashes_async(passwords: list[str]) -> list[str]:
+        return await password_hasher.hash_many(passwords)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        return await password_hasher.verify(plain_password, hashed_password)
+
+    @staticmethod
+    async def verify_and_update_password_async(
+        plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+
     @staticmethod
     def create_access_token(
         data: dict, expires_delta: Optional[timedelta] = None
@@ -39,8 +103,49 @@ class Auth:
         expire = datetime.now(timezone.utc) + (
             expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         )
-        to_encode.update({"exp": expire})
-        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        # iat с дробной частью: отзыв токенов пользователя не задевает
+        # токены, выданные в ту же секунду после отзыва
+        to_encode.update({"exp": expire, "iat": time.time()})
+        return Auth.encode_token(to_encode)
+
+    @staticmethod
+    def create_user_access_token(
+        user: User, expires_delta: Optional[timedelta] = None
+    ) -> str:
+        data: dict = {"sub": user.email}
+        if settings.STATELESS_AUTH:
+            data.update(
+                {
+                    "uid": user.id,
+                    "name": user.username,
+                    "roles": user.roles,
+                    "active": user.is_active,
+                    "ver": user.version,
+                }
+            )
+        return Auth.create_access_token(data, expires_delta)
+
+    @staticmethod
+    def principal_from_claims(payload: dict) -> User | None:
+        user_id = payload.get("uid")
+        version = payload.get("ver")
+        if not isinstance(user_id, int) or not isinstance(version, int):
+            return None
+        if not user_versions.is_current(user_id, version):
+            return None
+        try:
+            role_mask = roles_to_mask(payload.get("roles", []))
+        except (KeyError, ValueError):
+            return None
+        # Пользователь не привязан к сессии и собирается только из токена
+        return User(
+            id=user_id,
+            email=payload["sub"],
+            username=payload.get("name"),
+            is_active=bool(payload.get("active", False)),
+            role_mask=role_mask,
+            version=version,
+        )
 
     @staticmethod
     def create_refresh_token(
@@ -51,27 +156,65 @@ class Auth:
             expires_delta or timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
         )
         to_encode.update({"exp": expire})
-        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return Auth.encode_token(to_encode)
+
+    @staticmethod
+    def decode_token(token: str) -> dict:
+        payload = token_memo.get(token)
+        if payload is None:
+            payload = Auth._verify_token(token)
+            token_memo.put(token, payload)
+        if token_memo.is_revoked(token, payload):
+            raise JWTError("Token has been revoked")
+        return payload
+
+    @staticmethod
+    def decode_access_token(token: str) -> dict:
+        payload = Auth.decode_token(token)
+        if payload.get("sub") is None:
+            raise ValueError("Missing username in token")
+        if payload.get("typ") == "refresh":
+            raise ValueError("Refresh token used as access token")
+        return payload
+
+    @staticmethod
+    def decode_refresh_token(token: str) -> dict:
+        # Refresh-токены используются один раз, поэтому не попадают в кеш
+        payload = Auth._verify_token(token)
+        if payload.get("typ") != "refresh" or not payload.get("jti"):
+            raise JWTError("Not a refresh token")
+        return payload
+
+    @staticmethod
+    def revoke_token(token: str) -> None:
+        exp = jwt.get_unverified_claims(token).get("exp")
+        if isinstance(exp, (int, float)):
+            token_memo.revoke(token, exp)
+
+    @staticmethod
+    def revoke_user_tokens(email: str) -> None:
+        # Все access-токены пользователя, выданные до этого момента
+        token_memo.revoke_subject(email)
 
     @staticmethod
     async def get_current_user(
         token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
     ) -> User:
         try:
-            payload = jwt.decode(
-                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-            )
-            username: str = payload.get("sub", None)
-            if username is None:
-                raise ValueError("Missing username in token")
+            payload = Auth.decode_access_token(token)
         except (JWTError, ValueError):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
             )
 
+        if settings.STATELESS_AUTH:
+            principal = Auth.principal_from_claims(payload)
+            if principal is not None:
+                return principal
+
         user_repo = UserRepository(db)
-        user = await user_repo.get_by_email(username)
+        user = await user_repo.get_by_email(payload["sub"], use_cache=True)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
@@ -92,23 +235,19 @@ auth = Auth()
 
 
 def get_current_user_with_roles(*required_roles: UserRole):
+    # Маска требуемых ролей считается один раз при создании зависимости
+    required_mask = roles_to_mask(required_roles)
+
     async def current_user_with_roles(
         current_user: User = Depends(auth.get_current_active_user),
     ) -> User:
-        logger.info(
-            f"Current user: id={current_user.id}, username={current_user.username}, email={current_user.email}"
-        )
-        logger.info(f"Current user roles: {current_user.roles}")
-        logger.info(f"Required roles: {required_roles}")
-
-        # Преобразуем роли пользователя в объекты UserRole
-        user_roles = [UserRole(role) for role in current_user.roles]
-
-        has_required_role = any(role in user_roles for role in required_roles)
-        logger.info(f"User has required role: {has_required_role}")
-
-        if not has_required_role:
-            logger.warning("User does not have required roles")
+        if not current_user.has_any_role(required_mask):
+            log_sampled(
+                "WARNING",
+                "User {} does not have required roles {}",
+                current_user.id,
+                required_roles,
+            )
             raise HTTPException(status_code=403, detail="Not enough permissions")
         return current_user
 
@@ -0,0 +1,129 @@
+import hashlib
+import heapq
+import time
+from typing import Callable, Generic, Hashable, TypeVar
+
+from shared.core.cache import TTLCache
+from shared.core.config import settings
+
+K = TypeVar("K", bound=Hashable)
+
+
+class RevocationList(Generic[K]):
+    # Отзывы: ключ -> (срок хранения, значение). Запись удаляется только после
+    # своего срока (exp токена - дальше токен и так не пройдет проверку), без
+    # ограничения по размеру: вытеснение вернуло бы отозванный токен в оборот.
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._entries: dict[K, tuple[float, float]] = {}
+        self._heap: list[tuple[float, K]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: K, expires_at: float, value: float = 0.0) -> None:
+        self.prune()
+        if expires_at <= self.clock():
+            return
+        previous = self._entries.get(key)
+        if previous is not None:
+            # Повторный отзыв продлевает запись и сдвигает границу вперед
+            expires_at = max(expires_at, previous[0])
+            value = max(value, previous[1])
+        self._entries[key] = (expires_at, value)
+        heapq.heappush(self._heap, (expires_at, key))
+
+    def get(self, key: K) -> float | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[1]
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def prune(self) -> None:
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._heap.clear()
+
+
+class TokenMemo:
+    # Память уже проверенных токенов: sha256(token) -> payload.
+    # Запись живет ровно до exp токена, отозванные токены не отдаются.
+    # Отозвать можно один токен (logout) или все токены пользователя,
+    # выданные до момента отзыва (удаление, блокировка, кража refresh-токена).
+    def __init__(
+        self,
+        max_size: int,
+        max_token_lifetime: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.clock = clock
+        self.max_token_lifetime = max_token_lifetime
+        self._payloads: TTLCache[bytes, dict] = TTLCache(max_size, 0, clock=clock)
+        self._revoked: RevocationList[bytes] = RevocationList(clock)
+        self._revoked_subjects: RevocationList[str] = RevocationList(clock)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        return self._payloads.get(self.digest(token))
+
+    def put(self, token: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        digest = self.digest(token)
+        if digest in self._revoked:
+            return
+        self._payloads.set(digest, payload, expires_at=exp)
+
+    def revoke(self, token: str, exp: float) -> None:
+        digest = self.digest(token)
+        self._payloads.pop(digest)
+        self._revoked.add(digest, exp)
+
+    def revoke_subject(self, sub: str) -> None:
+        # Токены, выданные раньше этого момента, недействительны. Запись
+        # нужна, пока жив самый долгий из них.
+        now = self.clock()
+        self._revoked_subjects.add(sub, now + self.max_token_lifetime, now)
+
+    def is_revoked(self, token: str, payload: dict | None = None) -> bool:
+        if self.digest(token) in self._revoked:
+            return True
+        if payload is None:
+            return False
+        revoked_at = self._revoked_subjects.get(payload.get("sub"))
+        if revoked_at is None:
+            return False
+        issued_at = payload.get("iat")
+        # Токен без iat выдан до появления отзыва по пользователю
+        return not isinstance(issued_at, (int, float)) or issued_at <= revoked_at
+
+    def clear(self) -> None:
+        self._payloads.clear()
+        self._revoked.clear()
+        self._revoked_subjects.clear()
+
+    def stats(self) -> dict:
+        data = self._payloads.stats()
+        data["revoked"] = len(self._revoked)
+        data["revoked_subjects"] = len(self._revoked_subjects)
+        return data
+
+
+token_memo = TokenMemo(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    max_token_lifetime=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+from shared.core.config import settings
+
+REVOKED = -1
+
+
+# Последние известные процессу версии пользователей. Если версия в токене
+# отстает от известной, токен устарел и пользователь загружается из БД.
+class UserVersionRegistry:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._versions: OrderedDict[int, int] = OrderedDict()
+
+    def _set(self, user_id: int, version: int) -> None:
+        self._versions[user_id] = version
+        self._versions.move_to_end(user_id)
+        while len(self._versions) > self.max_size:
+            self._versions.popitem(last=False)
+
+    def bump(self, user_id: int, version: int) -> None:
+        current = self._versions.get(user_id)
+        if current == REVOKED or (current is not None and current >= version):
+            return
+        self._set(user_id, version)
+
+    def revoke(self, user_id: int) -> None:
+        self._set(user_id, REVOKED)
+
+    def is_current(self, user_id: int, version: int) -> bool:
+        known = self._versions.get(user_id)
+        if known is None:
+            return True
+        return known != REVOKED and version >= known
+
+    def clear(self) -> None:
+        self._versions.clear()
+
+
+user_versions = UserVersionRegistry(max_size=settings.USER_VERSION_REGISTRY_SIZE)
@@ -1,19 +1,119 @@
-from sqlalchemy.ext.asyncio import create_async_engine
+from contextlib import AsyncExitStack
+from typing import Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from shared.core.config import settings
-from sqlalchemy.orm import declarative_base
+from shared.core.metrics import instrument_engine
+from shared.db.pool import InstrumentedAsyncQueuePool
+from shared.db.replicas import ReplicaSet
+from sqlalchemy.orm import declarative_base, sessionmaker
 
 
 Base = declarative_base()
 
 
+def get_engine_options(url: str) -> dict:
+    options: dict = {"echo": settings.DB_ECHO, "future": True}
+    if url.startswith("sqlite"):
+        # SQLite используется только в тестах и выбирает пул сам
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if url.startswith("postgresql+asyncpg"):
+        connect_args: dict = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+            }
+        options["connect_args"] = connect_args
+    return options
+
+
+def create_engine_for_url(url: str):
+    async_engine = create_async_engine(url, **get_engine_options(url))
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
 def get_engine(test_mode=False):
     if test_mode:
         # Используем SQLite в памяти для тестов
-        return create_async_engine(
-            "sqlite+aiosqlite:///:memory:", echo=True, future=True
-        )
+        url = "sqlite+aiosqlite:///:memory:"
     else:
-        return create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+        url = settings.DATABASE_URL
+    return create_engine_for_url(url)
+
+
+async def open_connections(engine: AsyncEngine, count: int) -> int:
+    # Открывает соединения заранее: после закрытия они остаются в пуле
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        # Сверх pool_size соединения не сохраняются в пуле
+        count = min(count, size())
+    async with AsyncExitStack() as stack:
+        for _ in range(count):
+            connection = await stack.enter_async_context(engine.connect())
+            await connection.execute(text("SELECT 1"))
+    return count
+
+
+class Engines:
+    # Engines процесса. В приложении создаются явно в lifespan (start),
+    # в скриптах и тестах - при первом обращении к primary.
+    def __init__(self):
+        self._primary: Optional[AsyncEngine] = None
+        self._replicas: list[AsyncEngine] = []
+        self.replica_set = ReplicaSet([])
+        # Фабрика сессий на текущих engines, заполняется в shared.db.session
+        self.session_factory: Optional[sessionmaker] = None
+
+    @property
+    def started(self) -> bool:
+        return self._primary is not None
+
+    def start(
+        self, url: Optional[str] = None, replica_urls: Optional[Sequence[str]] = None
+    ) -> None:
+        if self._primary is not None:
+            return
+        if replica_urls is None:
+            replica_urls = settings.DATABASE_REPLICA_URLS
+        self._primary = create_engine_for_url(url or settings.DATABASE_URL)
+        self._replicas = [create_engine_for_url(url) for url in replica_urls]
+        self.replica_set = ReplicaSet(
+            self._replicas, retry_after=settings.DB_REPLICA_RETRY_SECONDS
+        )
+        self.session_factory = None
+
+    @property
+    def primary(self) -> AsyncEngine:
+        if self._primary is None:
+            self.start()
+        return self._primary
+
+    async def warm_up(self, connections: int) -> None:
+        for engine in [self.primary, *self._replicas]:
+            await open_connections(engine, connections)
+
+    async def dispose(self) -> None:
+        for engine in [*self._replicas, self._primary]:
+            if engine is not None:
+                await engine.dispose()
+        self._primary = None
+        self._replicas = []
+        self.replica_set = ReplicaSet([])
+        self.session_factory = None
 
 
-engine = get_engine()
+engines = Engines()
@@ -1,6 +1,6 @@
-from typing import List
-from sqlalchemy import Integer, String, Boolean, JSON
-from sqlalchemy.ext.mutable import MutableList
+from datetime import datetime
+from typing import Iterable, List, Optional
+from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey, func
 from sqlalchemy.orm import Mapped, mapped_column
 from enum import Enum as PyEnum
 
@@ -13,6 +13,32 @@ class UserRole(PyEnum):
     USER = "user"
 
 
+# Биты ролей в User.role_mask, порядок задает порядок ролей в ответах
+ROLE_BITS = {
+    UserRole.ADMIN: 1,
+    UserRole.MANAGER: 2,
+    UserRole.USER: 4,
+}
+
+
+def roles_to_mask(roles: Iterable) -> int:
+    mask = 0
+    for role in roles:
+        mask |= ROLE_BITS[UserRole(getattr(role, "value", role))]
+    return mask
+
+
+def mask_to_roles(mask: int) -> List[str]:
+    return [role.value for role, bit in ROLE_BITS.items() if mask & bit]
+
+
+def masks_with_role(role) -> List[int]:
+    # Все возможные маски, содержащие роль: позволяет искать по индексу
+    # через role_mask IN (...) вместо побитовой операции в WHERE
+    bit = ROLE_BITS[UserRole(getattr(role, "value", role))]
+    return [mask for mask in range(1 << len(ROLE_BITS)) if mask & bit]
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -21,20 +47,45 @@ class User(Base):
     email: Mapped[str] = mapped_column(String, unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
-    roles: Mapped[List[str]] = mapped_column(
-        MutableList.as_mutable(JSON()), default=[UserRole.USER.value]
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    role_mask: Mapped[int] = mapped_column(
+        Integer,
+        default=ROLE_BITS[UserRole.USER],
+        server_default=str(ROLE_BITS[UserRole.USER]),
+        index=True,
     )
 
+    @property
+    def roles(self) -> List[str]:
+        return mask_to_roles(self.role_mask or 0)
+
+    @roles.setter
+    def roles(self, roles: Iterable) -> None:
+        self.role_mask = roles_to_mask(roles)
+
+    def has_any_role(self, mask: int) -> bool:
+        return bool((self.role_mask or 0) & mask)
+
     def __repr__(self):
         return f"User(id={self.id}, username='{self.username}', email='{self.email}', roles={self.roles})"
 
-    @classmethod
-    def __declare_last__(cls):
-        from sqlalchemy import event
 
-        @event.listens_for(cls, "load")
-        def receive_load(instance, context):
-            if isinstance(instance.roles, list):
-                instance.roles = [
-                    UserRole(role) for role in instance.roles if isinstance(role, str)
-                ]
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    jti: Mapped[str] = mapped_column(String, unique=True, index=True)
+    # Все токены, полученные ротацией от одного логина, входят в одну семью
+    family_id: Mapped[str] = mapped_column(String, index=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    revoked: Mapped[bool] = mapped_column(Boolean, default=False)
+    replaced_by: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"RefreshToken(id={self.id}, user_id={self.user_id}, family_id='{self.family_id}', revoked={self.revoked})"
@@ -0,0 +1,33 @@
+import base64
+import json
+from typing import Any, Sequence
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(order_by: str, values: list[Any]) -> str:
+    raw = json.dumps({"o": order_by, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, types: Sequence[type]) -> list[Any]:
+    # types - ожидаемые типы значений: курсор приходит от клиента, и значение
+    # чужого типа в сравнении с колонкой дало бы ошибку БД вместо 400
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data["v"]
+        cursor_order = data["o"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if cursor_order != order_by or not isinstance(values, list):
+        raise InvalidCursorError("Cursor does not match the requested ordering")
+    if len(values) != len(types) or not all(
+        # bool - подкласс int, но id им не бывает
+        isinstance(value, expected) and not isinstance(value, bool)
+        for value, expected in zip(values, types)
+    ):
+        raise InvalidCursorError("Invalid cursor")
+    return values
@@ -0,0 +1,92 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import Executable
+
+# Опция выражения: SELECT выполняется на primary даже при наличии реплик
+PRIMARY_READ_OPTION = "read_from_primary"
+
+
+def read_from_primary(statement: Executable) -> Executable:
+    # Для чтений, которые не должны видеть отставание реплики: результат
+    # кладется в кеш или проверяется сразу после записи
+    return statement.execution_options(**{PRIMARY_READ_OPTION: True})
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    # Соединения, выданные пулом реплики и еще не возвращенные
+    in_use: int = 0
+    failures: int = 0
+    # До этого момента реплика считается недоступной
+    unhealthy_until: float = 0.0
+
+
+class ReplicaSet:
+    # Реплики для чтения. Выбирается доступная реплика с наименьшим числом
+    # занятых соединений; упавшая реплика исключается на retry_after секунд,
+    # после чего снова получает запросы.
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine],
+        retry_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.retry_after = retry_after
+        self.clock = clock
+        self.replicas = [Replica(engine) for engine in engines]
+        self._by_engine = {
+            id(replica.engine.sync_engine): replica for replica in self.replicas
+        }
+        self._next = 0
+        for replica in self.replicas:
+            self._track_pool(replica)
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    @staticmethod
+    def _track_pool(replica: Replica) -> None:
+        @event.listens_for(replica.engine.sync_engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            replica.in_use += 1
+
+        @event.listens_for(replica.engine.sync_engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            replica.in_use = max(0, replica.in_use - 1)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        now = self.clock()
+        healthy = [r for r in self.replicas if r.unhealthy_until <= now]
+        if not healthy:
+            return None
+        # Round-robin среди одинаково загруженных реплик
+        self._next += 1
+        least = min(replica.in_use for replica in healthy)
+        candidates = [r for r in healthy if r.in_use == least]
+        return candidates[self._next % len(candidates)].engine
+
+    def is_replica(self, sync_engine) -> bool:
+        return id(sync_engine) in self._by_engine
+
+    def mark_failed(self, sync_engine) -> None:
+        replica = self._by_engine.get(id(sync_engine))
+        if replica is not None:
+            replica.failures += 1
+            replica.unhealthy_until = self.clock() + self.retry_after
+
+    def status(self) -> list[dict]:
+        now = self.clock()
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "healthy": replica.unhealthy_until <= now,
+                "in_use": replica.in_use,
+                "failures": replica.failures,
+            }
+            for replica in self.replicas
+        ]
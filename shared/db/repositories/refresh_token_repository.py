@@ -0,0 +1,69 @@
+# shared/repositories/refresh_token_repository.py
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.db.models import RefreshToken
+from shared.db.replicas import read_from_primary
+
+
+class RefreshTokenRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create(
+        self, user_id: int, jti: str, family_id: str, expires_at: datetime
+    ) -> RefreshToken:
+        token = RefreshToken(
+            user_id=user_id, jti=jti, family_id=family_id, expires_at=expires_at
+        )
+        self.session.add(token)
+        await self.session.commit()
+        return token
+
+    async def get_by_jti(self, jti: str) -> RefreshToken | None:
+        # Токен мог быть создан или обменен только что: реплика его еще
+        # не видит
+        result = await self.session.execute(
+            read_from_primary(select(RefreshToken).filter(RefreshToken.jti == jti))
+        )
+        return result.scalar_one_or_none()
+
+    async def rotate(
+        self, token: RefreshToken, new_jti: str, expires_at: datetime
+    ) -> RefreshToken | None:
+        # Условный UPDATE: из двух параллельных обменов одного токена
+        # выигрывает только один
+        result = await self.session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == token.id, RefreshToken.revoked.is_(False))
+            .values(revoked=True, replaced_by=new_jti)
+        )
+        if result.rowcount != 1:
+            await self.session.rollback()
+            return None
+        new_token = RefreshToken(
+            user_id=token.user_id,
+            jti=new_jti,
+            family_id=token.family_id,
+            expires_at=expires_at,
+        )
+        self.session.add(new_token)
+        await self.session.commit()
+        return new_token
+
+    async def revoke_family(self, family_id: str) -> None:
+        await self.session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id)
+            .values(revoked=True)
+        )
+        await self.session.commit()
+
+    async def delete_expired(self, now: datetime) -> int:
+        result = await self.session.execute(
+            delete(RefreshToken).where(RefreshToken.expires_at < now)
+        )
+        await self.session.commit()
+        return result.rowcount
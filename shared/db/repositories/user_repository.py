@@ -1,9 +1,90 @@
 # shared/repositories/user_repository.py
+from dataclasses import dataclass, field
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from shared.db.models import User
+from sqlalchemy import delete, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from shared.core.token_cache import token_memo
+from shared.core.user_versions import user_versions
+from shared.db.models import User, mask_to_roles, masks_with_role, roles_to_mask
+from shared.db.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from shared.db.replicas import read_from_primary
+from shared.db.user_cache import user_cache
 from shared.db.schemas.user import UserCreateInDB, UserUpdateInDB
-from typing import List, Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence
+
+# Колонки, по которым доступна keyset-пагинация (id добавляется для уникальности)
+SORT_COLUMNS = {
+    "id": User.id,
+    "username": User.username,
+    "email": User.email,
+}
+# Типы значений в курсоре для каждого порядка сортировки
+CURSOR_TYPES = {
+    "id": (int,),
+    "username": (str, int),
+    "email": (str, int),
+}
+
+# Колонки, доступные для выгрузки (hashed_password не выгружается никогда)
+EXPORT_COLUMNS = {
+    "id": User.id,
+    "username": User.username,
+    "email": User.email,
+    "is_active": User.is_active,
+    "roles": User.role_mask.label("roles"),
+    "version": User.version,
+}
+
+# Колонки ответа API: чтение без сборки ORM-объектов
+RESPONSE_COLUMNS = (
+    User.id,
+    User.username,
+    User.email,
+    User.is_active,
+    User.role_mask,
+    User.version,
+)
+
+
+def _response_row(row) -> dict:
+    return {
+        "id": row.id,
+        "username": row.username,
+        "email": row.email,
+        "is_active": row.is_active,
+        "roles": mask_to_roles(row.role_mask),
+        "version": row.version,
+    }
+
+
+class UserAlreadyExistsError(ValueError):
+    pass
+
+
+def _to_row(values: dict) -> dict:
+    # Список ролей хранится в БД битовой маской
+    if "roles" in values:
+        roles = values.pop("roles")
+        if roles is not None:
+            values["role_mask"] = roles_to_mask(roles)
+    return values
+
+
+@dataclass(order=True)
+class BulkConflict:
+    # Индекс записи во входных данных
+    index: int
+    email: str
+    username: str
+    reason: str
+
+
+@dataclass
+class BulkCreateResult:
+    created: List[int] = field(default_factory=list)
+    conflicts: List[BulkConflict] = field(default_factory=list)
 
 
 class UserRepository:
@@ -11,19 +92,169 @@ class UserRepository:
         self.session = session
 
     async def create(self, user_data: UserCreateInDB) -> User:
-        existing_user = await self.get_by_email(user_data.email)
-        if existing_user:
-            raise ValueError("User with this email already exists")
-
-        db_user = User(**user_data.model_dump())
-        self.session.add(db_user)
-        await self.session.commit()
-        await self.session.refresh(db_user)
+        # Один INSERT ... ON CONFLICT DO NOTHING RETURNING вместо
+        # проверки существования, INSERT и refresh
+        statement = (
+            self._insert(User)
+            .values(**_to_row(user_data.model_dump(mode="json")))
+            .returning(User)
+        )
+        try:
+            result = await self.session.scalars(statement)
+            db_user = result.one_or_none()
+        except IntegrityError:
+            await self.session.rollback()
+            db_user = None
+        else:
+            await self.session.commit()
+        if db_user is None:
+            raise UserAlreadyExistsError(
+                "User with this email or username already exists"
+            )
         return db_user
 
-    async def get_by_id(self, user_id: int) -> User | None:
-        result = await self.session.execute(select(User).filter(User.id == user_id))
-        return result.scalar_one_or_none()
+    def _insert(self, entity=User.__table__):
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(entity).on_conflict_do_nothing()
+        if dialect == "sqlite":
+            return sqlite.insert(entity).on_conflict_do_nothing()
+        return insert(entity)
+
+    async def bulk_create(
+        self,
+        users: Sequence,
+        chunk_size: int = 500,
+        prepare: Optional[Callable[[List], Awaitable[List[UserCreateInDB]]]] = None,
+    ) -> BulkCreateResult:
+        # prepare превращает записи чанка, прошедшие проверку на конфликты,
+        # в UserCreateInDB непосредственно перед их вставкой (например,
+        # хеширует пароли): обработка не опережает запись больше чем на чанк
+        result = BulkCreateResult()
+        seen_emails: set[str] = set()
+        seen_usernames: set[str] = set()
+        table = User.__table__
+
+        for start in range(0, len(users), chunk_size):
+            chunk = list(enumerate(users[start : start + chunk_size], start))
+            emails = [user.email for _, user in chunk]
+            usernames = [user.username for _, user in chunk]
+            existing = await self.session.execute(
+                select(User.email, User.username).filter(
+                    or_(User.email.in_(emails), User.username.in_(usernames))
+                )
+            )
+            existing_emails, existing_usernames = set(), set()
+            for email, username in existing:
+                existing_emails.add(email)
+                existing_usernames.add(username)
+
+            accepted = []
+            for index, user in chunk:
+                if user.email in seen_emails or user.username in seen_usernames:
+                    reason = "Duplicate user in request"
+                elif user.email in existing_emails:
+                    reason = "User with this email already exists"
+                elif user.username in existing_usernames:
+                    reason = "User with this username already exists"
+                else:
+                    reason = None
+                seen_emails.add(user.email)
+                seen_usernames.add(user.username)
+                if reason is not None:
+                    result.conflicts.append(
+                        BulkConflict(index, user.email, user.username, reason)
+                    )
+                    continue
+                accepted.append((index, user))
+
+            if not accepted:
+                continue
+            prepared = [user for _, user in accepted]
+            if prepare is not None:
+                prepared = await prepare(prepared)
+            rows = [_to_row(user.model_dump(mode="json")) for user in prepared]
+            pending = {user.email: (index, user.username) for index, user in accepted}
+            # Многострочный INSERT; строки, добавленные параллельно другим
+            # запросом, отсекаются ON CONFLICT DO NOTHING
+            inserted = await self.session.execute(
+                self._insert().returning(table.c.id, table.c.email), rows
+            )
+            for user_id, email in inserted:
+                result.created.append(user_id)
+                pending.pop(email, None)
+            await self.session.commit()
+            for email, (index, username) in pending.items():
+                result.conflicts.append(
+                    BulkConflict(index, email, username, "User already exists")
+                )
+
+        result.conflicts.sort()
+        return result
+
+    async def get_by_id(self, user_id: int, use_cache: bool = False) -> User | None:
+        if use_cache:
+            cached = user_cache.get_by_id(user_id)
+            if cached is not None:
+                return cached
+        query = select(User).filter(User.id == user_id)
+        # Строка попадет в кеш: читаем с primary, иначе отстающая реплика
+        # вернет в кеш данные, которые update/delete уже сбросили
+        result = await self.session.execute(
+            read_from_primary(query) if use_cache else query
+        )
+        user = result.scalar_one_or_none()
+        if use_cache and user is not None:
+            user_cache.put(user)
+        return user
+
+    async def _get_many(
+        self, column, keys: Sequence, chunk_size: int, primary: bool = False
+    ) -> dict:
+        # Один запрос IN на chunk_size ключей (лимит параметров драйвера)
+        found: dict = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), chunk_size):
+            chunk = unique[start : start + chunk_size]
+            query = select(User).filter(column.in_(chunk))
+            result = await self.session.execute(
+                read_from_primary(query) if primary else query
+            )
+            for user in result.scalars():
+                found[getattr(user, column.key)] = user
+        return found
+
+    async def get_many_by_ids(
+        self, user_ids: Sequence[int], chunk_size: int = 500
+    ) -> List[User | None]:
+        # Результат в порядке входных ключей, None - пользователь не найден
+        found = await self._get_many(User.id, user_ids, chunk_size)
+        return [found.get(user_id) for user_id in user_ids]
+
+    async def get_many_by_usernames(
+        self, usernames: Sequence[str], chunk_size: int = 500
+    ) -> List[User | None]:
+        found = await self._get_many(User.username, usernames, chunk_size)
+        return [found.get(username) for username in usernames]
+
+    async def get_many_by_emails(
+        self, emails: Sequence[str], use_cache: bool = False, chunk_size: int = 500
+    ) -> List[User | None]:
+        found: dict = {}
+        if use_cache:
+            for email in emails:
+                cached = user_cache.get_by_email(email)
+                if cached is not None:
+                    found[email] = cached
+        missing = [email for email in emails if email not in found]
+        loaded = await self._get_many(
+            User.email, missing, chunk_size, primary=use_cache
+        )
+        if use_cache:
+            for user in loaded.values():
+                user_cache.put(user)
+        found.update(loaded)
+        return [found.get(email) for email in emails]
 
     async def get_by_username(self, username: str) -> User | None:
         result = await self.session.execute(
@@ -31,34 +262,208 @@ class UserRepository:
         )
         return result.scalar_one_or_none()
 
-    async def get_by_email(self, email: str) -> Optional[User]:
-        result = await self.session.execute(select(User).filter(User.email == email))
-        return result.scalars().first()
+    async def get_by_email(self, email: str, use_cache: bool = False) -> Optional[User]:
+        if use_cache:
+            cached = user_cache.get_by_email(email)
+            if cached is not None:
+                return cached
+        query = select(User).filter(User.email == email)
+        result = await self.session.execute(
+            read_from_primary(query) if use_cache else query
+        )
+        user = result.scalars().first()
+        if use_cache and user is not None:
+            user_cache.put(user)
+        return user
 
     async def list(self, skip: int = 0, limit: int = 100) -> List[User]:
-        result = await self.session.execute(select(User).offset(skip).limit(limit))
+        result = await self.session.execute(
+            select(User).order_by(User.id).offset(skip).limit(limit)
+        )
         return list(result.scalars().all())
 
+    async def get_version(self, user_id: int) -> int | None:
+        # Для проверки ETag без загрузки пользователя
+        return await self.session.scalar(
+            select(User.version).filter(User.id == user_id)
+        )
+
+    async def get_row(self, user_id: int) -> dict | None:
+        result = await self.session.execute(
+            select(*RESPONSE_COLUMNS).filter(User.id == user_id)
+        )
+        row = result.one_or_none()
+        return _response_row(row) if row is not None else None
+
+    async def _fetch_page(
+        self,
+        entities: tuple,
+        limit: int,
+        cursor: str | None,
+        order_by: str,
+        is_active: bool | None,
+        username_prefix: str | None,
+        role: str | None,
+    ) -> tuple[list, str | None]:
+        if order_by not in SORT_COLUMNS:
+            raise InvalidCursorError(f"Unsupported ordering: {order_by}")
+        sort_column = SORT_COLUMNS[order_by]
+
+        query = select(*entities)
+        if is_active is not None:
+            query = query.filter(User.is_active == is_active)
+        if username_prefix:
+            query = query.filter(
+                User.username.startswith(username_prefix, autoescape=True)
+            )
+        if role is not None:
+            query = query.filter(User.role_mask.in_(masks_with_role(role)))
+
+        if cursor is not None:
+            values = decode_cursor(cursor, order_by, CURSOR_TYPES[order_by])
+            if order_by == "id":
+                query = query.filter(User.id > values[0])
+            else:
+                query = query.filter(tuple_(sort_column, User.id) > tuple(values))
+
+        if order_by == "id":
+            query = query.order_by(User.id)
+        else:
+            query = query.order_by(sort_column, User.id)
+
+        # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+        result = await self.session.execute(query.limit(limit + 1))
+        rows = list(result.scalars().all() if len(entities) == 1 else result.all())
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            values = (
+                [last.id] if order_by == "id" else [getattr(last, order_by), last.id]
+            )
+            next_cursor = encode_cursor(order_by, values)
+        return rows, next_cursor
+
+    async def list_page(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        is_active: bool | None = None,
+        username_prefix: str | None = None,
+        role: str | None = None,
+    ) -> tuple[List[User], str | None]:
+        return await self._fetch_page(
+            (User,), limit, cursor, order_by, is_active, username_prefix, role
+        )
+
+    async def list_page_rows(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        is_active: bool | None = None,
+        username_prefix: str | None = None,
+        role: str | None = None,
+    ) -> tuple[List[dict], str | None]:
+        # Та же страница, что и list_page, но строками колонок ответа
+        rows, next_cursor = await self._fetch_page(
+            RESPONSE_COLUMNS, limit, cursor, order_by, is_active, username_prefix, role
+        )
+        return [_response_row(row) for row in rows], next_cursor
+
+    async def list_page_versions(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        is_active: bool | None = None,
+        username_prefix: str | None = None,
+        role: str | None = None,
+    ) -> tuple[List[tuple[int, int]], str | None]:
+        # Та же страница, что и list_page, но только (id, version)
+        entities = (User.id, User.version)
+        if order_by in SORT_COLUMNS and order_by != "id":
+            entities += (SORT_COLUMNS[order_by],)
+        rows, next_cursor = await self._fetch_page(
+            entities, limit, cursor, order_by, is_active, username_prefix, role
+        )
+        return [(row.id, row.version) for row in rows], next_cursor
+
+    async def stream_rows(
+        self, fields: List[str], batch_size: int = 1000
+    ) -> AsyncIterator[List[dict]]:
+        # Серверный курсор: в памяти одновременно не больше batch_size строк
+        query = (
+            select(*[EXPORT_COLUMNS[field] for field in fields])
+            .order_by(User.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.session.stream(query)
+        async for partition in result.mappings().partitions():
+            rows = [dict(row) for row in partition]
+            if "roles" in fields:
+                for row in rows:
+                    row["roles"] = mask_to_roles(row["roles"])
+            yield rows
+
     async def update(
         self, user_id: int, user_data: UserUpdateInDB, full_update: bool = False
     ) -> User | None:
-        user = await self.get_by_id(user_id)
-        if user:
-            if full_update:
-                for key, value in user_data.model_dump(exclude_unset=True).items():
-                    setattr(user, key, value)
-            else:
-                for key, value in user_data.model_dump(exclude_unset=True).items():
-                    if value is not None:
-                        setattr(user, key, value)
+        values = user_data.model_dump(exclude_unset=True)
+        if not full_update:
+            values = {key: value for key, value in values.items() if value is not None}
+        values = _to_row(values)
+        statement = (
+            update(User)
+            .where(User.id == user_id)
+            .values(**values, version=User.version + 1)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        try:
+            result = await self.session.scalars(statement)
+            user = result.one_or_none()
             await self.session.commit()
-            await self.session.refresh(user)
+        except IntegrityError:
+            await self.session.rollback()
+            raise UserAlreadyExistsError(
+                "User with this email or username already exists"
+            )
+        if user is not None:
+            user_cache.invalidate(user.id)
+            user_versions.bump(user.id, user.version)
+            if not user.is_active:
+                # Заблокированный пользователь теряет уже выданные токены
+                token_memo.revoke_subject(user.email)
         return user
 
+    async def update_password_hash(
+        self, user_id: int, old_hash: str, new_hash: str
+    ) -> bool:
+        # Перехеширование не меняет данные пользователя, поэтому версия не
+        # увеличивается; условие по старому хешу не перетирает смену пароля
+        result = await self.session.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+            .returning(User.id)
+        )
+        updated = result.scalar_one_or_none() is not None
+        await self.session.commit()
+        if updated:
+            user_cache.invalidate(user_id)
+        return updated
+
     async def delete(self, user_id: int) -> bool:
-        user = await self.get_by_id(user_id)
-        if user:
-            await self.session.delete(user)
-            await self.session.commit()
-            return True
-        return False
+        result = await self.session.execute(
+            delete(User).where(User.id == user_id).returning(User.email)
+        )
+        email = result.scalar_one_or_none()
+        await self.session.commit()
+        if email is None:
+            return False
+        user_cache.invalidate(user_id)
+        user_versions.revoke(user_id)
+        token_memo.revoke_subject(email)
+        return True
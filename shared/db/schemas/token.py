@@ -1,6 +1,33 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
+from shared.db.schemas.user import UserRole
+
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class IntrospectionResponse(BaseModel):
+    # RFC 7662: у неактивного токена возвращается только active
+    active: bool
+    sub: Optional[str] = None
+    username: Optional[str] = None
+    roles: Optional[list[UserRole]] = None
+    exp: Optional[int] = None
+    token_type: Optional[str] = None
+
+
+class IntrospectionBatchRequest(BaseModel):
+    tokens: list[str]
+
+
+class IntrospectionBatchResponse(BaseModel):
+    results: list[IntrospectionResponse]
@@ -1,5 +1,5 @@
 # shared/schemas/user.py
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from typing import Optional, List
 from enum import Enum
 
@@ -69,8 +69,44 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class UserLookupRequest(BaseModel):
+    # Ровно один вид ключей
+    ids: list[int] | None = None
+    usernames: list[str] | None = None
+    emails: list[str] | None = None
+
+    @model_validator(mode="after")
+    def ensure_single_key_kind(self):
+        kinds = [keys for keys in (self.ids, self.usernames, self.emails) if keys]
+        if len(kinds) != 1:
+            raise ValueError("Provide exactly one of ids, usernames or emails")
+        return self
+
+    @property
+    def keys(self) -> list:
+        return self.ids or self.usernames or self.emails
+
+
+class UserLookupResponse(BaseModel):
+    # Найденные пользователи в порядке ключей запроса
+    users: list[UserResponse]
+    missing: list[int | str]
+
+
 class UserUpdateFull(BaseModel):
     username: str
     email: EmailStr
     is_active: bool
     roles: List[UserRole]
+
+
+class UserImportError(BaseModel):
+    index: int
+    email: str | None = None
+    username: str | None = None
+    reason: str
+
+
+class UserImportResult(BaseModel):
+    created: int
+    failed: List[UserImportError]
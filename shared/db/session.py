@@ -1,19 +1,174 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from sqlalchemy import event
+from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from shared.db.database import get_engine
+from sqlalchemy.orm import Session, sessionmaker
+from shared.core.metrics import db_session_hold_seconds, db_sessions_unused_total
+from shared.db.database import engines, get_engine
+from shared.db.replicas import PRIMARY_READ_OPTION, ReplicaSet
 
 
-def get_async_session_local(test_mode=False):
-    engine = get_engine(test_mode)
-    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+class TrackedSession(Session):
+    # Сессия, которая считает, сколько времени держала соединение из пула
+    pass
 
 
-AsyncSessionLocal = get_async_session_local()
+@event.listens_for(TrackedSession, "after_begin")
+def _connection_acquired(session, transaction, connection):
+    session.info.setdefault("acquired_at", time.perf_counter())
 
 
-async def get_db():
-    async with AsyncSessionLocal() as session:
+@event.listens_for(TrackedSession, "after_transaction_end")
+def _connection_released(session, transaction):
+    if transaction.parent is not None:
+        return
+    acquired_at = session.info.pop("acquired_at", None)
+    if acquired_at is not None:
+        session.info["hold_time"] = session.info.get("hold_time", 0.0) + (
+            time.perf_counter() - acquired_at
+        )
+
+
+def _is_plain_select(statement: Any) -> bool:
+    return (
+        getattr(statement, "is_select", False)
+        and getattr(statement, "_for_update_arg", None) is None
+    )
+
+
+class RoutingSession(TrackedSession):
+    # Одиночные SELECT уходят на реплику, все остальное - на primary.
+    # SELECT с опцией read_from_primary тоже читается с primary.
+    # После первой записи сессия до конца читает с primary, чтобы запрос
+    # видел собственные изменения.
+    def __init__(self, *args: Any, replicas: ReplicaSet | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        info = self.info
+        if self.replicas and not info.get("primary_only") and not self._flushing:
+            if clause is not None and _is_plain_select(clause):
+                if not clause.get_execution_options().get(PRIMARY_READ_OPTION):
+                    replica = self.replicas.choose()
+                    if replica is not None:
+                        info["replica"] = replica.sync_engine
+                        return replica.sync_engine
+            else:
+                info["primary_only"] = True
+        info.pop("replica", None)
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def get_async_session_local(test_mode=False, replicas: ReplicaSet | None = None):
+    # Рабочая сессия использует общий engine, чтобы в процессе был один пул
+    bind = get_engine(test_mode) if test_mode else engines.primary
+    return sessionmaker(
+        bind,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+        replicas=replicas,
+    )
+
+
+def get_session_factory() -> sessionmaker:
+    # Фабрика создается вместе с engines и пересоздается после их dispose
+    if engines.session_factory is None:
+        engines.session_factory = get_async_session_local(replicas=engines.replica_set)
+    return engines.session_factory
+
+
+class LazySession:
+    # Сессия запроса, которая создается при первом обращении. Одиночные
+    # SELECT вне транзакции сразу завершаются commit, поэтому соединение
+    # возвращается в пул после последнего запроса, а не в конце запроса.
+    # Изменения (INSERT/UPDATE/DELETE, flush) остаются в одной транзакции.
+    def __init__(self, session_factory: sessionmaker, autorelease: bool = True):
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
+        self.autorelease = autorelease
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    @property
+    def used(self) -> bool:
+        return self._session is not None
+
+    @property
+    def hold_time(self) -> float:
+        if self._session is None:
+            return 0.0
+        return self._session.sync_session.info.get("hold_time", 0.0)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def _run(self, method: str, statement: Any, *args: Any, **kwargs: Any):
+        session = self.session
+        release = (
+            self.autorelease
+            and _is_plain_select(statement)
+            and not session.in_transaction()
+            and not (session.new or session.dirty or session.deleted)
+        )
         try:
-            yield session
-        finally:
-            await session.close()
+            result = await getattr(session, method)(statement, *args, **kwargs)
+        except (OperationalError, InterfaceError):
+            replica = session.sync_session.info.pop("replica", None)
+            if not release or replica is None:
+                raise
+            # Реплика недоступна: исключаем ее и повторяем чтение
+            await session.rollback()
+            session.sync_session.replicas.mark_failed(replica)
+            result = await getattr(session, method)(statement, *args, **kwargs)
+        if release:
+            # Результат execute в async-сессии уже буферизован
+            await session.commit()
+        return result
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any):
+        return await self._run("execute", statement, *args, **kwargs)
+
+    async def scalars(self, statement: Any, *args: Any, **kwargs: Any):
+        return await self._run("scalars", statement, *args, **kwargs)
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any):
+        return await self._run("scalar", statement, *args, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+async def get_db():
+    session = LazySession(get_session_factory())
+    try:
+        yield session
+    finally:
+        await session.close()
+        if session.used:
+            db_session_hold_seconds.observe(session.hold_time)
+        else:
+            db_sessions_unused_total.inc()
+
+
+@asynccontextmanager
+async def detached_session(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    # Сессия на том же engine, что и сессия запроса, но со своим временем жизни:
+    # нужна для StreamingResponse, который читает БД уже после закрытия get_db.
+    # Чтение в ней может идти с реплики.
+    async with AsyncSession(
+        session.bind,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        replicas=engines.replica_set,
+    ) as new_session:
+        yield new_session
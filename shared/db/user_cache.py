@@ -0,0 +1,71 @@
+from shared.core.cache import TTLCache
+from shared.core.config import settings
+from shared.db.models import User
+
+
+class UserCache:
+    # Кеш хранит снимки колонок, а не ORM-объекты: на каждое попадание
+    # создается новый отсоединенный User, который не привязан к сессии
+    def __init__(self, max_size: int, ttl: float, enabled: bool = True):
+        # Индекс email -> id ограничен размером основного кеша; при размере 0
+        # кеш ничего не хранит, а индекс рос бы без ограничения
+        if enabled and max_size <= 0:
+            raise ValueError(
+                "USER_CACHE_MAX_SIZE must be positive when the user cache is enabled"
+            )
+        self.enabled = enabled
+        self._by_id: TTLCache[int, dict] = TTLCache(
+            max_size, ttl, on_evict=self._drop_email
+        )
+        self._email_to_id: dict[str, int] = {}
+        self._columns = [column.key for column in User.__table__.columns]
+
+    def _drop_email(self, user_id: int, snapshot: dict) -> None:
+        if self._email_to_id.get(snapshot["email"]) == user_id:
+            del self._email_to_id[snapshot["email"]]
+
+    @staticmethod
+    def _build(snapshot: dict) -> User:
+        return User(**snapshot)
+
+    def get_by_id(self, user_id: int) -> User | None:
+        if not self.enabled:
+            return None
+        snapshot = self._by_id.get(user_id)
+        return self._build(snapshot) if snapshot is not None else None
+
+    def get_by_email(self, email: str) -> User | None:
+        if not self.enabled:
+            return None
+        user_id = self._email_to_id.get(email)
+        if user_id is None:
+            self._by_id.record_miss()
+            return None
+        return self.get_by_id(user_id)
+
+    def put(self, user: User) -> None:
+        if not self.enabled:
+            return
+        snapshot = {column: getattr(user, column) for column in self._columns}
+        previous = self._by_id.peek(user.id)
+        if previous is not None:
+            self._drop_email(user.id, previous)
+        self._by_id.set(user.id, snapshot)
+        self._email_to_id[user.email] = user.id
+
+    def invalidate(self, user_id: int) -> None:
+        self._by_id.pop(user_id)
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._email_to_id.clear()
+
+    def stats(self) -> dict:
+        return self._by_id.stats()
+
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    enabled=settings.USER_CACHE_ENABLED,
+)
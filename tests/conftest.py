@@ -8,6 +8,10 @@ from test_config import test_settings
 from services.service_gateway.main import app
 from httpx import AsyncClient
 from shared.db.session import get_db  # Add this import
+from shared.core.user_versions import user_versions
+from shared.db.user_cache import user_cache
+from shared.core.token_cache import token_memo
+from shared.core.rate_limit import login_rate_limiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -67,4 +71,8 @@ async def clear_tables(engine, create_tables):
     async with engine.begin() as conn:
         for table in reversed(Base.metadata.sorted_tables):
             await conn.execute(table.delete())
+    user_versions.clear()
+    user_cache.clear()
+    token_memo.clear()
+    await login_rate_limiter.clear()
     yield
@@ -1,8 +1,19 @@
 import pytest
+import asyncio
 import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from shared.db.repositories.refresh_token_repository import RefreshTokenRepository
 from shared.db.repositories.user_repository import UserRepository
 from shared.db.schemas.user import UserCreateInDB, UserCreate
 from shared.core.security import auth
+from shared.core.config import settings
+from shared.core.hashing import build_context
+from shared.core.keys import KeyRing
+from shared.core.lifecycle import cleanup_refresh_tokens
+from shared.core.rate_limit import RateLimit, login_rate_limiter
+from services.auth_service.api import routes as auth_routes
 
 
 @pytest.mark.asyncio
@@ -103,13 +114,15 @@ async def test_refresh_token(db_session, client):
     assert login_response.status_code == 200
 
     initial_token = login_response.json()["access_token"]
+    initial_refresh_token = login_response.json()["refresh_token"]
 
     # Добавляем небольшую задержку перед обновлением токена
     time.sleep(1)
 
-    # Используем полученный токен для запроса на обновление
-    headers = {"Authorization": f"Bearer {initial_token}"}
-    refresh_response = await client.post("/auth/refresh", headers=headers)
+    # Обмениваем refresh-токен на новую пару токенов
+    refresh_response = await client.post(
+        "/auth/refresh", json={"refresh_token": initial_refresh_token}
+    )
 
     assert (
         refresh_response.status_code == 200
@@ -122,6 +135,7 @@ async def test_refresh_token(db_session, client):
     assert (
         refresh_data["access_token"] != initial_token
     ), "Refreshed token should be different from the initial token"
+    assert refresh_data["refresh_token"] != initial_refresh_token
 
     # Проверяем, что новый токен действителен
     new_token_headers = {"Authorization": f"Bearer {refresh_data['access_token']}"}
@@ -130,3 +144,400 @@ async def test_refresh_token(db_session, client):
     assert user_response.status_code == 200
     user_data = user_response.json()
     assert user_data["email"] == "refreshuser@example.com"
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_family(db_session, client):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="reuseuser",
+            email="reuseuser@example.com",
+            hashed_password=auth.get_password_hash("reusepassword123"),
+        )
+    )
+    login_data = {"username": "reuseuser@example.com", "password": "reusepassword123"}
+    login_response = await client.post("/auth/login", data=login_data)
+    first_refresh = login_response.json()["refresh_token"]
+
+    response = await client.post("/auth/refresh", json={"refresh_token": first_refresh})
+    assert response.status_code == 200
+    second_refresh = response.json()["refresh_token"]
+
+    # Повторное использование старого токена отзывает всю семью
+    response = await client.post("/auth/refresh", json={"refresh_token": first_refresh})
+    assert response.status_code == 401
+
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": second_refresh}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_access_tokens(db_session, client):
+    await UserRepository(db_session).create(
+        UserCreateInDB(
+            username="stolen",
+            email="stolen@example.com",
+            hashed_password=auth.get_password_hash("stolenpassword123"),
+        )
+    )
+    login_data = {"username": "stolen@example.com", "password": "stolenpassword123"}
+    tokens = (await client.post("/auth/login", data=login_data)).json()
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    rotated = response.json()
+    headers = {"Authorization": f"Bearer {rotated['access_token']}"}
+    assert (await client.get("/api/users/me", headers=headers)).status_code == 200
+
+    # Старый refresh-токен предъявлен повторно: отзываются и access-токены
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+    assert (await client.get("/api/users/me", headers=headers)).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_access_and_refresh_tokens(db_session, client):
+    await UserRepository(db_session).create(
+        UserCreateInDB(
+            username="leaving",
+            email="leaving@example.com",
+            hashed_password=auth.get_password_hash("leavingpassword123"),
+        )
+    )
+    login_data = {"username": "leaving@example.com", "password": "leavingpassword123"}
+    tokens = (await client.post("/auth/login", data=login_data)).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get("/api/users/me", headers=headers)).status_code == 200
+
+    response = await client.post(
+        "/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers=headers,
+    )
+    assert response.status_code == 204
+
+    assert (await client.get("/api/users/me", headers=headers)).status_code == 401
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
+    response = await client.post("/auth/logout", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_cleanup_deletes_expired_refresh_tokens(engine, db_session):
+    user = await UserRepository(db_session).create(
+        UserCreateInDB(
+            username="cleanupuser",
+            email="cleanupuser@example.com",
+            hashed_password="not-a-real-hash",
+        )
+    )
+    tokens = RefreshTokenRepository(db_session)
+    now = datetime.now(timezone.utc)
+    await tokens.create(user.id, "expired", "family", now - timedelta(minutes=1))
+    await tokens.create(user.id, "active", "family", now + timedelta(minutes=1))
+
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    assert await cleanup_refresh_tokens(session_factory) == 1
+
+    assert await tokens.get_by_jti("expired") is None
+    assert await tokens.get_by_jti("active") is not None
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_not_an_access_token(db_session, client):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="typeuser",
+            email="typeuser@example.com",
+            hashed_password=auth.get_password_hash("typepassword123"),
+        )
+    )
+    login_data = {"username": "typeuser@example.com", "password": "typepassword123"}
+    login_response = await client.post("/auth/login", data=login_data)
+    tokens = login_response.json()
+
+    headers = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+    response = await client.get("/api/users/me", headers=headers)
+    assert response.status_code == 401
+
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": tokens["access_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_jwks_endpoint(client, monkeypatch):
+    response = await client.get("/auth/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}
+
+    ring = KeyRing(
+        algorithm="RS256", rotation_interval=3600, publish_ahead=60, retention=600
+    )
+    monkeypatch.setattr(settings, "ALGORITHM", "RS256")
+    monkeypatch.setattr(auth_routes, "keyring", ring)
+
+    response = await client.get("/auth/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert "max-age" in response.headers["cache-control"]
+    keys = response.json()["keys"]
+    assert len(keys) == 1
+    assert keys[0]["kty"] == "RSA"
+    assert keys[0]["kid"] == ring.signing_key().kid
+    assert "d" not in keys[0]
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limit_rejects_before_verification(client, monkeypatch):
+    monkeypatch.setattr(login_rate_limiter, "per_account", RateLimit(2, 60))
+    calls = []
+
+    async def fake_authenticate(self, username, password):
+        calls.append(username)
+        return None
+
+    monkeypatch.setattr(auth_routes.AuthService, "authenticate_user", fake_authenticate)
+
+    form_data = {"username": "victim@example.com", "password": "wrong"}
+    for _ in range(2):
+        response = await client.post("/auth/login", data=form_data)
+        assert response.status_code == 401
+
+    response = await client.post("/auth/login", data=form_data)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert len(calls) == 2
+
+    # Другая учетная запись с того же адреса не заблокирована
+    other = {"username": "other@example.com", "password": "wrong"}
+    response = await client.post("/auth/login", data=other)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_password_hash(db_session, client):
+    user_repo = UserRepository(db_session)
+    old_hash = build_context(["bcrypt"], bcrypt_rounds=4).hash("rehashpassword")
+    user = await user_repo.create(
+        UserCreateInDB(
+            username="rehash",
+            email="rehash@example.com",
+            hashed_password=old_hash,
+        )
+    )
+
+    form_data = {"username": "rehash@example.com", "password": "rehashpassword"}
+    response = await client.post("/auth/login", data=form_data)
+    assert response.status_code == 200
+
+    await db_session.refresh(user)
+    assert user.hashed_password != old_hash
+    assert user.hashed_password.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert auth.verify_password("rehashpassword", user.hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_login_rate_limit_uses_forwarded_client_ip(client, monkeypatch):
+    monkeypatch.setattr(login_rate_limiter, "per_ip", RateLimit(2, 60))
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["127.0.0.1"])
+
+    async def fake_authenticate(self, username, password):
+        return None
+
+    monkeypatch.setattr(auth_routes.AuthService, "authenticate_user", fake_authenticate)
+
+    async def login(forwarded_for: str, username: str):
+        return await client.post(
+            "/auth/login",
+            data={"username": username, "password": "wrong"},
+            headers={"X-Forwarded-For": forwarded_for},
+        )
+
+    # Запросы приходят от шлюза (127.0.0.1), но у каждого клиента свой лимит
+    for i in range(2):
+        assert (await login("10.0.0.1", f"a{i}@example.com")).status_code == 401
+    assert (await login("10.0.0.1", "a2@example.com")).status_code == 429
+    for i in range(2):
+        assert (await login("10.0.0.2", f"b{i}@example.com")).status_code == 401
+    # Подставленный клиентом адрес слева не помогает обойти лимит
+    response = await login("10.9.9.9, 10.0.0.1", "a3@example.com")
+    assert response.status_code == 429
+
+    # Соединение не от доверенного прокси: заголовок не учитывается
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", [])
+    for i in range(2):
+        assert (await login(f"10.1.0.{i}", f"c{i}@example.com")).status_code == 401
+    assert (await login("10.1.0.9", "c9@example.com")).status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    await client.get("/auth/.well-known/jwks.json")
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'http_requests_total{method="GET",route="/auth/.well-known/jwks.json",'
+        'status="200"}' in text
+    )
+    assert "http_request_duration_seconds_bucket" in text
+    assert 'db_statement_duration_seconds_count{statement="DELETE"}' in text
+    assert "password_hashing_queue_depth" in text
+    assert "# TYPE password_hashing_rejected_total counter" in text
+    assert "# TYPE db_pool_wait_seconds_total counter" in text
+
+
+INTROSPECTION_CLIENT = {"Authorization": "Bearer s3cret"}
+
+
+@pytest.mark.asyncio
+async def test_token_introspection(db_session, client, monkeypatch):
+    monkeypatch.setattr(settings, "INTROSPECTION_CLIENT_SECRETS", ["s3cret"])
+    user_repo = UserRepository(db_session)
+    active = await user_repo.create(
+        UserCreateInDB(
+            username="active",
+            email="active@example.com",
+            hashed_password="hashed_password",
+        )
+    )
+    disabled = await user_repo.create(
+        UserCreateInDB(
+            username="disabled",
+            email="disabled@example.com",
+            hashed_password="hashed_password",
+            is_active=False,
+        )
+    )
+    active_token = auth.create_user_access_token(active)
+    disabled_token = auth.create_user_access_token(disabled)
+    refresh_token = auth.create_refresh_token(
+        {"sub": active.email, "jti": "introspect", "typ": "refresh"}
+    )
+
+    response = await client.post(
+        "/auth/introspect", data={"token": active_token}, headers=INTROSPECTION_CLIENT
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "active": True,
+        "sub": "active@example.com",
+        "username": "active",
+        "roles": ["user"],
+        "exp": response.json()["exp"],
+        "token_type": "Bearer",
+    }
+    assert response.headers["cache-control"].startswith("private, max-age=")
+
+    lookups = []
+    get_many_by_emails = UserRepository.get_many_by_emails
+
+    async def counting_get_many_by_emails(self, emails, **kwargs):
+        lookups.append(list(emails))
+        return await get_many_by_emails(self, emails, **kwargs)
+
+    monkeypatch.setattr(
+        UserRepository, "get_many_by_emails", counting_get_many_by_emails
+    )
+    tokens = [active_token, "garbage", disabled_token, active_token, refresh_token]
+    response = await client.post(
+        "/auth/introspect/batch", json={"tokens": tokens}, headers=INTROSPECTION_CLIENT
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["active"] for result in results] == [
+        True,
+        False,
+        False,
+        True,
+        False,
+    ]
+    assert results[1] == {"active": False}
+    # Пользователи всей пачки загружаются одним обращением
+    assert lookups == [["active@example.com", "disabled@example.com"]]
+
+    monkeypatch.setattr(settings, "INTROSPECTION_BATCH_MAX_TOKENS", 2)
+    response = await client.post(
+        "/auth/introspect/batch", json={"tokens": tokens}, headers=INTROSPECTION_CLIENT
+    )
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_token_introspection_requires_client_secret(client, monkeypatch):
+    monkeypatch.setattr(settings, "INTROSPECTION_CLIENT_SECRETS", ["s3cret"])
+
+    response = await client.post("/auth/introspect", data={"token": "garbage"})
+    assert response.status_code == 401
+
+    response = await client.post(
+        "/auth/introspect", data={"token": "garbage"}, headers=INTROSPECTION_CLIENT
+    )
+    assert response.status_code == 200
+    assert response.json() == {"active": False}
+
+
+@pytest.mark.asyncio
+async def test_token_introspection_is_closed_without_client_secrets(
+    client, monkeypatch
+):
+    monkeypatch.setattr(settings, "INTROSPECTION_CLIENT_SECRETS", [])
+    token = auth.create_access_token({"sub": "user@example.com"})
+
+    response = await client.post("/auth/introspect", data={"token": token})
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+    response = await client.post(
+        "/auth/introspect/batch",
+        json={"tokens": [token]},
+        headers={"Authorization": "Bearer "},
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_ready_is_503_until_warm_up(client):
+    response = await client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_up_pools_before_ready(client, monkeypatch, tmp_path):
+    from services.service_gateway.main import app
+    from shared.db.database import engines
+
+    await engines.dispose()
+    monkeypatch.setattr(
+        settings, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path}/a.db"
+    )
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", [])
+
+    async with app.router.lifespan_context(app):
+        readiness = app.state.readiness
+        for _ in range(200):
+            if readiness.ready:
+                break
+            await asyncio.sleep(0.05)
+        response = await client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["checks"] == {
+            "database": "ok",
+            "signing_keys": "ok",
+            "hashing": "ok",
+        }
+
+    assert not readiness.ready
+    assert not engines.started
@@ -1,11 +1,20 @@
+import json
 import pytest
 from shared.db.repositories.user_repository import UserRepository
-from shared.db.schemas.user import UserCreateInDB, UserUpdateFull, UserRole
+from shared.db.schemas.user import (
+    UserCreateInDB,
+    UserUpdateFull,
+    UserUpdateInDB,
+    UserRole,
+)
+from shared.core.config import settings
+from shared.core.hashing import HashingError, password_hasher
 from shared.core.security import auth
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sqlalchemy import delete
 from shared.db.models import User  # Убедитесь, что путь импорта правильный
+from shared.db.pagination import encode_cursor
 
 
 @pytest.fixture(autouse=True)
@@ -245,3 +254,374 @@ async def test_update_user_full(db_session, client):
     assert updated_user["email"] == "newuser@example.com"
     assert updated_user["is_active"] is True
     assert set(updated_user["roles"]) == {UserRole.USER.value, UserRole.MANAGER.value}
+
+
+@pytest.mark.asyncio
+async def test_stateless_auth_skips_user_lookup(db_session, client, monkeypatch):
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="stateless",
+            email="stateless@example.com",
+            hashed_password=auth.get_password_hash("statelesspass"),
+            roles=[UserRole.USER],
+        )
+    )
+    login_data = {"username": "stateless@example.com", "password": "statelesspass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    token = login_response.json()["access_token"]
+
+    async def fail_lookup(self, email):
+        raise AssertionError("Database lookup is not expected")
+
+    monkeypatch.setattr(UserRepository, "get_by_email", fail_lookup)
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await client.get("/api/users/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["username"] == "stateless"
+    assert response.json()["roles"] == [UserRole.USER.value]
+
+
+@pytest.mark.asyncio
+async def test_stateless_auth_rejects_stale_token(db_session, client, monkeypatch):
+    monkeypatch.setattr(settings, "STATELESS_AUTH", True)
+    user_repo = UserRepository(db_session)
+    user = await user_repo.create(
+        UserCreateInDB(
+            username="stateless",
+            email="stateless@example.com",
+            hashed_password=auth.get_password_hash("statelesspass"),
+            roles=[UserRole.USER],
+        )
+    )
+    login_data = {"username": "stateless@example.com", "password": "statelesspass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    token = login_response.json()["access_token"]
+
+    # Деактивация повышает версию пользователя и отзывает выданные токены
+    await user_repo.update(user.id, UserUpdateInDB(is_active=False))
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await client.get("/api/users/me", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_get_all_users_cursor_pagination(db_session, client):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="admin",
+            email="admin@example.com",
+            hashed_password=auth.get_password_hash("adminpass"),
+            roles=[UserRole.ADMIN.value],
+        )
+    )
+    for i in range(4):
+        await user_repo.create(
+            UserCreateInDB(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                hashed_password="hashed_password",
+            )
+        )
+
+    login_data = {"username": "admin@example.com", "password": "adminpass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = await client.get("/api/users/", headers=headers, params=params)
+        assert response.status_code == 200
+        seen.extend(user["username"] for user in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params = {"limit": 2, "cursor": next_cursor}
+
+    assert seen == ["admin", "user0", "user1", "user2", "user3"]
+
+    response = await client.get(
+        "/api/users/", headers=headers, params={"cursor": "garbage"}
+    )
+    assert response.status_code == 400
+
+    # Корректный формат, но id - строка
+    response = await client.get(
+        "/api/users/", headers=headers, params={"cursor": encode_cursor("id", ["abc"])}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_users(db_session, client):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="admin",
+            email="admin@example.com",
+            hashed_password=auth.get_password_hash("adminpass"),
+            roles=[UserRole.ADMIN.value],
+        )
+    )
+    for i in range(3):
+        await user_repo.create(
+            UserCreateInDB(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                hashed_password="hashed_password",
+            )
+        )
+
+    login_data = {"username": "admin@example.com", "password": "adminpass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    response = await client.get(
+        "/api/users/export", headers=headers, params={"batch_size": 2}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["username"] for row in rows] == ["admin", "user0", "user1", "user2"]
+    assert rows[0]["roles"] == ["admin"]
+    assert all("hashed_password" not in row for row in rows)
+
+    response = await client.get(
+        "/api/users/export",
+        headers=headers,
+        params={"format": "csv", "fields": "id,email"},
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,email"
+    assert len(lines) == 5
+    assert lines[1].endswith(",admin@example.com")
+
+    response = await client.get(
+        "/api/users/export", headers=headers, params={"fields": "hashed_password"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_import_users(db_session, client):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="admin",
+            email="admin@example.com",
+            hashed_password=auth.get_password_hash("adminpass"),
+            roles=[UserRole.ADMIN.value],
+        )
+    )
+    login_data = {"username": "admin@example.com", "password": "adminpass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    payload = [
+        {"username": "bulk0", "email": "bulk0@example.com", "password": "pass0"},
+        {"username": "bulk1", "email": "bulk1@example.com", "password": "pass1"},
+        {"username": "admin2", "email": "admin@example.com", "password": "pass2"},
+        {"username": "bulk0", "email": "other@example.com", "password": "pass3"},
+        {"username": "broken", "email": "not-an-email", "password": "pass4"},
+    ]
+    response = await client.post("/api/users/import", headers=headers, json=payload)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2
+    assert [error["index"] for error in result["failed"]] == [2, 3, 4]
+
+    imported = await user_repo.get_by_email("bulk1@example.com")
+    assert imported is not None
+    assert auth.verify_password("pass1", imported.hashed_password)
+
+    csv_body = (
+        "username,email,password,roles\n"
+        'csvuser,csvuser@example.com,csvpass,"user,manager"\n'
+        "bulk1,bulk1@example.com,pass1,\n"
+    )
+    response = await client.post(
+        "/api/users/import",
+        headers={**headers, "Content-Type": "text/csv"},
+        content=csv_body,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 1
+    assert result["failed"][0]["index"] == 1
+
+    csv_user = await user_repo.get_by_email("csvuser@example.com")
+    assert set(csv_user.roles) == {"user", "manager"}
+
+
+@pytest.mark.asyncio
+async def test_import_users_commits_chunk_by_chunk(db_session, client, monkeypatch):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="admin",
+            email="admin@example.com",
+            hashed_password=auth.get_password_hash("adminpass"),
+            roles=[UserRole.ADMIN.value],
+        )
+    )
+    login_data = {"username": "admin@example.com", "password": "adminpass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    hashed_chunks = []
+    hash_many = password_hasher.hash_many
+
+    async def failing_hash_many(passwords):
+        # Второй чанк не хешируется: хешер перегружен
+        hashed_chunks.append(len(passwords))
+        if len(hashed_chunks) > 1:
+            raise HashingError("busy")
+        return await hash_many(passwords)
+
+    monkeypatch.setattr(settings, "USER_IMPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(password_hasher, "hash_many", failing_hash_many)
+    payload = [
+        {"username": f"chunk{i}", "email": f"chunk{i}@example.com", "password": "pw"}
+        for i in range(5)
+    ]
+    response = await client.post("/api/users/import", headers=headers, json=payload)
+    assert response.status_code == 503
+    # Пароли хешируются по чанку перед его вставкой, а не все заранее
+    assert hashed_chunks == [2, 2]
+
+    # Первый чанк уже закоммичен
+    assert await user_repo.get_by_email("chunk1@example.com") is not None
+    assert await user_repo.get_by_email("chunk2@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_with_etags(db_session, client):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="admin",
+            email="admin@example.com",
+            hashed_password=auth.get_password_hash("adminpass"),
+            roles=[UserRole.ADMIN.value],
+        )
+    )
+    user = await user_repo.create(
+        UserCreateInDB(
+            username="polled",
+            email="polled@example.com",
+            hashed_password="hashed_password",
+        )
+    )
+
+    login_data = {"username": "admin@example.com", "password": "adminpass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    response = await client.get(f"/api/users/{user.id}", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = await client.get(
+        f"/api/users/{user.id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    page = await client.get("/api/users/", headers=headers, params={"limit": 1})
+    page_etag = page.headers["etag"]
+    response = await client.get(
+        "/api/users/",
+        headers={**headers, "If-None-Match": page_etag},
+        params={"limit": 1},
+    )
+    assert response.status_code == 304
+    assert response.headers["x-next-cursor"] == page.headers["x-next-cursor"]
+
+    full_page = await client.get("/api/users/", headers=headers)
+    full_page_etag = full_page.headers["etag"]
+
+    me = await client.get("/api/users/me", headers=headers)
+    response = await client.get(
+        "/api/users/me", headers={**headers, "If-None-Match": me.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+    # Изменение пользователя повышает версию и меняет ETag страницы и ресурса
+    await client.patch(
+        f"/api/users/{user.id}", headers=headers, json={"username": "renamed"}
+    )
+    response = await client.get(
+        f"/api/users/{user.id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["username"] == "renamed"
+    response = await client.get(
+        "/api/users/", headers={**headers, "If-None-Match": full_page_etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != full_page_etag
+
+
+@pytest.mark.asyncio
+async def test_lookup_users(db_session, client, monkeypatch):
+    user_repo = UserRepository(db_session)
+    await user_repo.create(
+        UserCreateInDB(
+            username="admin",
+            email="admin@example.com",
+            hashed_password=auth.get_password_hash("adminpass"),
+            roles=[UserRole.ADMIN.value],
+        )
+    )
+    users = [
+        await user_repo.create(
+            UserCreateInDB(
+                username=f"feed{i}",
+                email=f"feed{i}@example.com",
+                hashed_password="hashed_password",
+            )
+        )
+        for i in range(3)
+    ]
+
+    login_data = {"username": "admin@example.com", "password": "adminpass"}
+    login_response = await client.post("/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    ids = [users[2].id, 999_999, users[0].id, users[2].id]
+    response = await client.post(
+        "/api/users/lookup", headers=headers, json={"ids": ids}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [user["id"] for user in data["users"]] == [users[2].id, users[0].id]
+    assert data["missing"] == [999_999]
+    assert "hashed_password" not in data["users"][0]
+
+    response = await client.post(
+        "/api/users/lookup",
+        headers=headers,
+        json={"emails": ["feed1@example.com", "ghost@example.com"]},
+    )
+    assert [user["username"] for user in response.json()["users"]] == ["feed1"]
+    assert response.json()["missing"] == ["ghost@example.com"]
+
+    response = await client.post(
+        "/api/users/lookup", headers=headers, json={"ids": [1], "usernames": ["x"]}
+    )
+    assert response.status_code == 422
+
+    monkeypatch.setattr(settings, "USER_LOOKUP_MAX_KEYS", 2)
+    response = await client.post(
+        "/api/users/lookup", headers=headers, json={"ids": ids}
+    )
+    assert response.status_code == 413
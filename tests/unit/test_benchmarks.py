@@ -0,0 +1,22 @@
+from benchmarks.compare import find_regressions
+from benchmarks.results import percentile, summarize
+
+
+def test_summarize_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)], elapsed=2.0)
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == 50
+    assert summary["p95_ms"] == 95
+    assert summary["p99_ms"] == 99
+    assert summary["ops_per_sec"] == 50
+    assert percentile([], 50) == 0.0
+
+
+def test_find_regressions():
+    baseline = {"results": {"http.login": {"p95_ms": 100.0, "ops_per_sec": 50.0}}}
+    current = {"results": {"http.login": {"p95_ms": 115.0, "ops_per_sec": 30.0}}}
+
+    regressions = find_regressions(baseline, current, threshold=20)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("http.login.ops_per_sec")
+    assert find_regressions(baseline, baseline, threshold=20) == []
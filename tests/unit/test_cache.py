@@ -0,0 +1,165 @@
+import time
+
+import pytest
+from jose import JWTError
+
+from shared.core.cache import TTLCache
+from shared.core.security import auth
+from shared.core.token_cache import TokenMemo, token_memo
+from shared.db.models import UserRole
+from shared.db.repositories.user_repository import UserRepository
+from shared.db.schemas.user import UserCreateInDB, UserUpdateInDB
+from shared.db.user_cache import UserCache, user_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["size"] == 2
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(max_size=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, expires_at=20)
+
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    clock.now = 20
+    assert cache.get("b") is None
+    assert cache.stats()["expirations"] == 2
+
+
+@pytest.mark.asyncio
+async def test_user_cache_is_invalidated_on_update(db_session):
+    user_repo = UserRepository(db_session)
+    user = await user_repo.create(
+        UserCreateInDB(
+            username="cacheduser",
+            email="cacheduser@example.com",
+            hashed_password="hashed_password",
+            roles=[UserRole.USER.value],
+        )
+    )
+
+    cached = await user_repo.get_by_email("cacheduser@example.com", use_cache=True)
+    assert cached is not None
+    assert user_cache.get_by_email("cacheduser@example.com") is not None
+
+    await user_repo.update(user.id, UserUpdateInDB(is_active=False))
+    assert user_cache.get_by_id(user.id) is None
+
+    fresh = await user_repo.get_by_id(user.id, use_cache=True)
+    assert fresh is not None
+    assert fresh.is_active is False
+    assert user_cache.get_by_id(user.id).is_active is False
+
+    await user_repo.delete(user.id)
+    assert user_cache.get_by_email("cacheduser@example.com") is None
+
+
+def test_token_memo_caches_until_expiry():
+    token = auth.create_access_token({"sub": "memo@example.com"})
+    hits = token_memo.stats()["hits"]
+
+    first = auth.decode_token(token)
+    second = auth.decode_token(token)
+
+    assert first is second
+    assert token_memo.stats()["hits"] == hits + 1
+
+    expired = {"sub": "memo@example.com", "exp": time.time() - 1}
+    token_memo.put("expired-token", expired)
+    assert token_memo.get("expired-token") is None
+
+
+def test_token_memo_never_serves_revoked_token():
+    token = auth.create_access_token({"sub": "memo@example.com"})
+    auth.decode_token(token)
+
+    auth.revoke_token(token)
+
+    with pytest.raises(JWTError):
+        auth.decode_token(token)
+
+
+def test_token_memo_keeps_revocations_beyond_max_size():
+    memo = TokenMemo(max_size=2, max_token_lifetime=60)
+    exp = time.time() + 60
+    tokens = [f"token-{i}" for i in range(5)]
+    for token in tokens:
+        memo.revoke(token, exp)
+
+    assert all(memo.is_revoked(token) for token in tokens)
+    memo.put(tokens[0], {"sub": "memo@example.com", "exp": exp})
+    assert memo.get(tokens[0]) is None
+
+
+def test_token_memo_revokes_with_caching_disabled():
+    memo = TokenMemo(max_size=0, max_token_lifetime=60)
+    memo.revoke("token", time.time() + 60)
+
+    assert memo.is_revoked("token")
+
+
+def test_token_memo_prunes_revocations_after_token_expiry():
+    now = [1000.0]
+    memo = TokenMemo(max_size=2, max_token_lifetime=60, clock=lambda: now[0])
+    memo.revoke("short", 1010.0)
+    memo.revoke("long", 1100.0)
+
+    now[0] = 1050.0
+    memo.revoke("other", 1200.0)
+
+    assert not memo.is_revoked("short")
+    assert memo.is_revoked("long")
+    assert memo.stats()["revoked"] == 2
+
+
+def test_user_cache_requires_a_bound_when_enabled():
+    with pytest.raises(ValueError):
+        UserCache(max_size=0, ttl=30)
+    assert UserCache(max_size=0, ttl=30, enabled=False).get_by_id(1) is None
+
+
+def test_token_memo_revokes_tokens_issued_before_subject_revocation():
+    now = [1000.0]
+    memo = TokenMemo(max_size=10, max_token_lifetime=60, clock=lambda: now[0])
+    old = {"sub": "memo@example.com", "iat": 999.5, "exp": 1060}
+    legacy = {"sub": "memo@example.com", "exp": 1060}
+    other = {"sub": "other@example.com", "iat": 999.5, "exp": 1060}
+
+    memo.revoke_subject("memo@example.com")
+    now[0] = 1000.5
+    fresh = {"sub": "memo@example.com", "iat": 1000.5, "exp": 1060.5}
+
+    assert memo.is_revoked("old", old)
+    assert memo.is_revoked("legacy", legacy)
+    assert not memo.is_revoked("other", other)
+    assert not memo.is_revoked("fresh", fresh)
+
+    # После жизни самого долгого токена запись больше не нужна
+    now[0] = 1061
+    memo.revoke_subject("third@example.com")
+    assert memo.stats()["revoked_subjects"] == 1
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from shared.core.config import settings
+from shared.db.database import get_engine_options, open_connections
+from shared.db.pool import InstrumentedAsyncQueuePool, get_pool_status
+
+
+def test_production_engine_options(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "DB_STATEMENT_CACHE_SIZE", 0)
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+    options = get_engine_options("postgresql+asyncpg://user:password@db/app")
+
+    assert options["echo"] is False
+    assert options["poolclass"] is InstrumentedAsyncQueuePool
+    assert options["pool_size"] == 20
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    assert options["connect_args"]["server_settings"] == {"statement_timeout": "5000"}
+
+
+def test_sqlite_engine_options_skip_pool_settings():
+    options = get_engine_options("sqlite+aiosqlite:///:memory:")
+
+    assert "poolclass" not in options
+    assert "connect_args" not in options
+
+
+@pytest.mark.asyncio
+async def test_pool_status_reports_checkouts_and_waits(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+
+    async def query(delay: float):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(delay)
+
+    try:
+        async with engine.connect():
+            status = get_pool_status(engine)
+            assert status["checked_out"] == 1
+        await asyncio.gather(query(0.05), query(0))
+        status = get_pool_status(engine)
+    finally:
+        await engine.dispose()
+
+    assert status["pool_class"] == "InstrumentedAsyncQueuePool"
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 3
+    assert status["max_wait"] >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_open_connections_fills_pool_up_to_its_size(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'warm.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=3,
+        max_overflow=5,
+    )
+    try:
+        opened = await open_connections(engine, 10)
+        status = get_pool_status(engine)
+    finally:
+        await engine.dispose()
+
+    assert opened == 3
+    assert status["checked_in"] == 3
+    assert status["checked_out"] == 0
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from shared.core.hashing import (
+    HashingQueueFullError,
+    HashingTimeoutError,
+    PasswordHasher,
+    build_context,
+    password_hasher,
+)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_hash_and_verify():
+    hashed = await password_hasher.hash("secretpassword")
+
+    assert hashed != "secretpassword"
+    assert await password_hasher.verify("secretpassword", hashed) is True
+    assert await password_hasher.verify("wrongpassword", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, queue_size=1, timeout=5, pool_kind="thread")
+    try:
+        results = await asyncio.gather(
+            hasher.hash("first"), hasher.hash("second"), return_exceptions=True
+        )
+    finally:
+        hasher.shutdown()
+
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], HashingQueueFullError)
+    stats = hasher.stats()
+    assert stats["completed"] == 1
+    assert stats["rejected"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 1
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_timeout():
+    hasher = PasswordHasher(workers=1, queue_size=4, timeout=0.001, pool_kind="thread")
+    try:
+        with pytest.raises(HashingTimeoutError):
+            await hasher.hash("slowpassword")
+    finally:
+        hasher.shutdown()
+
+    assert hasher.stats()["timed_out"] == 1
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_keeps_slot_until_timed_out_job_finishes():
+    hasher = PasswordHasher(workers=1, queue_size=1, timeout=0.001, pool_kind="thread")
+    try:
+        with pytest.raises(HashingTimeoutError):
+            await hasher.hash("slowpassword")
+        # bcrypt еще работает в пуле: очередь по-прежнему занята
+        assert hasher.stats()["queue_depth"] == 1
+        with pytest.raises(HashingQueueFullError):
+            await hasher.hash("another")
+
+        for _ in range(200):
+            if hasher.stats()["queue_depth"] == 0:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        hasher.shutdown()
+
+    assert hasher.stats()["queue_depth"] == 0
+
+
+def test_context_requests_rehash_when_cost_changes():
+    cheap = build_context(["bcrypt"], bcrypt_rounds=4)
+    hashed = cheap.hash("secretpassword")
+    assert not cheap.needs_update(hashed)
+
+    stronger = build_context(["bcrypt"], bcrypt_rounds=5)
+    assert stronger.needs_update(hashed)
+    verified, new_hash = stronger.verify_and_update("secretpassword", hashed)
+    assert verified
+    assert new_hash.startswith("$2b$05$")
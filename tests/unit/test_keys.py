@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from shared.core import security
+from shared.core.config import settings
+from shared.core.keys import KeyRing
+from shared.core.security import auth
+
+
+@pytest.fixture
+def rsa_keyring(monkeypatch, tmp_path):
+    ring = KeyRing(
+        algorithm="RS256",
+        rotation_interval=3600,
+        publish_ahead=60,
+        retention=600,
+        keys_dir=str(tmp_path),
+    )
+    monkeypatch.setattr(settings, "ALGORITHM", "RS256")
+    monkeypatch.setattr(security, "keyring", ring)
+    return ring
+
+
+def test_token_is_signed_with_kid(rsa_keyring):
+    token = auth.create_access_token({"sub": "keys@example.com"})
+
+    header = jwt.get_unverified_header(token)
+    assert header["alg"] == "RS256"
+    assert header["kid"] == rsa_keyring.signing_key().kid
+    assert auth.decode_token(token)["sub"] == "keys@example.com"
+
+
+def test_rotated_key_is_published_before_signing(rsa_keyring):
+    old_key = rsa_keyring.signing_key()
+    old_token = auth.create_access_token({"sub": "keys@example.com"})
+
+    new_key = rsa_keyring.rotate()
+
+    kids = {key["kid"] for key in rsa_keyring.jwks()["keys"]}
+    assert kids == {old_key.kid, new_key.kid}
+    assert rsa_keyring.signing_key().kid == old_key.kid
+
+    old_key.not_before -= 10
+    new_key.not_before = time.time() - 1
+    assert rsa_keyring.signing_key().kid == new_key.kid
+    assert auth.decode_token(old_token)["sub"] == "keys@example.com"
+
+
+def test_keys_are_shared_through_keys_dir(rsa_keyring, tmp_path):
+    token = auth.create_access_token({"sub": "keys@example.com"})
+
+    other = KeyRing(
+        algorithm="RS256",
+        rotation_interval=3600,
+        publish_ahead=60,
+        retention=600,
+        keys_dir=str(tmp_path),
+    )
+    kid = jwt.get_unverified_header(token)["kid"]
+    assert other.get(kid) is not None
+
+
+def test_unknown_kid_is_rejected(rsa_keyring):
+    foreign = KeyRing(
+        algorithm="RS256", rotation_interval=3600, publish_ahead=60, retention=600
+    )
+    key = foreign.signing_key()
+    token = jwt.encode(
+        {"sub": "keys@example.com", "exp": time.time() + 60},
+        key.private_key,
+        algorithm="RS256",
+        headers={"kid": key.kid},
+    )
+
+    with pytest.raises(JWTError):
+        auth.decode_token(token)
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from shared.core import lifecycle
+from shared.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_warm_up_retries_failed_step_before_ready(monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_RETRY_SECONDS", 0)
+    attempts = []
+
+    async def flaky_database(create_tables=False):
+        attempts.append(create_tables)
+        if len(attempts) == 1:
+            raise ConnectionError("database is starting")
+
+    async def noop():
+        pass
+
+    steps = [
+        ("database", lambda: flaky_database(create_tables=True)),
+        ("signing_keys", noop),
+        ("hashing", noop),
+    ]
+
+    readiness = lifecycle.Readiness()
+    assert readiness.status()["status"] == "starting"
+
+    await lifecycle.warm_up(readiness, steps)
+
+    assert attempts == [True, True]
+    assert readiness.ready
+    assert readiness.status() == {
+        "status": "ready",
+        "checks": {"database": "ok", "signing_keys": "ok", "hashing": "ok"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_periodic_job_survives_failures():
+    runs = []
+
+    async def job():
+        runs.append(len(runs))
+        if len(runs) == 1:
+            raise ConnectionError("database is restarting")
+        if len(runs) == 3:
+            raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        await lifecycle.run_periodically("cleanup", 0, job)
+
+    assert runs == [0, 1, 2]
+
+
+def test_refresh_token_cleanup_job_follows_settings(monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_CLEANUP_INTERVAL_SECONDS", 60)
+    assert [name for name, _, _ in lifecycle.service_jobs()] == [
+        "refresh_token_cleanup"
+    ]
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_CLEANUP_INTERVAL_SECONDS", 0)
+    assert lifecycle.service_jobs() == []
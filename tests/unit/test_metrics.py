@@ -0,0 +1,52 @@
+import pytest
+
+from shared.core.metrics import Counter, Metric, Registry, _statement_type
+from shared.db.database import Engines
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram(
+        "latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0)
+    )
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert histogram.count("/a") == 3
+
+
+def test_counter_and_collectors():
+    registry = Registry()
+    counter = registry.register(Counter("events_total", "Events", ("kind",)))
+    gauge = registry.gauge("queue_depth", "Queue depth")
+    registry.add_collector(lambda: gauge.set(7))
+    counter.inc('say "hi"')
+
+    text = registry.render()
+    assert 'events_total{kind="say \\"hi\\""} 1' in text
+    assert "queue_depth 7" in text
+
+
+def test_statement_type():
+    assert _statement_type("  select 1") == "SELECT"
+    assert _statement_type("PRAGMA foreign_keys") == "OTHER"
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric("plain", "No samples")
+
+
+def test_db_pool_collector_does_not_start_engines(monkeypatch):
+    from services.service_gateway.api import routes
+
+    monkeypatch.setattr(routes, "engines", Engines())
+    routes.collect_db_pool_stats()
+    assert not routes.engines.started
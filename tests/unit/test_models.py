@@ -1,9 +1,13 @@
 import pytest
-from shared.db.models import User, UserRole
-from shared.db.repositories.user_repository import UserRepository
+from shared.db.models import User, UserRole, mask_to_roles, roles_to_mask
+from shared.db.repositories.user_repository import (
+    UserAlreadyExistsError,
+    UserRepository,
+)
 from shared.db.schemas.user import UserCreateInDB, UserUpdateInDB, UserUpdate
 from sqlalchemy import delete
 from services.user_service.service import UserService
+from shared.db.pagination import InvalidCursorError, encode_cursor
 
 
 @pytest.mark.asyncio
@@ -198,3 +202,164 @@ async def test_user_service_update(db_session):
     assert db_user.username == "updatedusername"
     assert db_user.email == "updateuser@example.com"
     assert db_user.roles == [UserRole.USER.value]
+
+
+@pytest.mark.asyncio
+async def test_user_repository_list_page(db_session):
+    await db_session.execute(delete(User))
+    await db_session.commit()
+
+    user_repo = UserRepository(db_session)
+    for name in ["delta", "alpha", "echo", "charlie", "bravo"]:
+        await user_repo.create(
+            UserCreateInDB(
+                username=name,
+                email=f"{name}@example.com",
+                hashed_password="hashed_password",
+                is_active=name != "echo",
+            )
+        )
+
+    first_page, cursor = await user_repo.list_page(limit=2, order_by="username")
+    assert [user.username for user in first_page] == ["alpha", "bravo"]
+    assert cursor is not None
+
+    second_page, cursor = await user_repo.list_page(
+        limit=2, cursor=cursor, order_by="username"
+    )
+    assert [user.username for user in second_page] == ["charlie", "delta"]
+
+    last_page, cursor = await user_repo.list_page(
+        limit=2, cursor=cursor, order_by="username"
+    )
+    assert [user.username for user in last_page] == ["echo"]
+    assert cursor is None
+
+    active, _ = await user_repo.list_page(limit=10, is_active=True)
+    assert len(active) == 4
+
+    with pytest.raises(InvalidCursorError):
+        await user_repo.list_page(limit=2, cursor="not-a-cursor")
+
+    # Курсор корректного формата, но со значениями чужого типа
+    for order_by, values in (
+        ("id", ["abc"]),
+        ("id", [True]),
+        ("id", [1, 2]),
+        ("username", [1, 2]),
+        ("email", ["a@example.com", "1"]),
+        ("email", ["a@example.com"]),
+    ):
+        with pytest.raises(InvalidCursorError):
+            await user_repo.list_page(
+                limit=2, cursor=encode_cursor(order_by, values), order_by=order_by
+            )
+
+
+@pytest.mark.asyncio
+async def test_user_repository_write_conflicts(db_session):
+    user_repo = UserRepository(db_session)
+    first = await user_repo.create(
+        UserCreateInDB(
+            username="first",
+            email="first@example.com",
+            hashed_password="hashed_password",
+        )
+    )
+    await user_repo.create(
+        UserCreateInDB(
+            username="second",
+            email="second@example.com",
+            hashed_password="hashed_password",
+        )
+    )
+
+    with pytest.raises(UserAlreadyExistsError):
+        await user_repo.create(
+            UserCreateInDB(
+                username="third",
+                email="first@example.com",
+                hashed_password="hashed_password",
+            )
+        )
+    first_id, first_version = first.id, first.version
+    with pytest.raises(UserAlreadyExistsError):
+        await user_repo.update(first_id, UserUpdateInDB(email="second@example.com"))
+
+    updated = await user_repo.update(first_id, UserUpdateInDB(username="renamed"))
+    assert updated.username == "renamed"
+    assert updated.email == "first@example.com"
+    assert updated.version == first_version + 1
+
+    assert await user_repo.update(first_id + 1000, UserUpdateInDB(username="x")) is None
+    assert await user_repo.delete(first_id + 1000) is False
+
+
+@pytest.mark.asyncio
+async def test_user_roles_bitmask(db_session):
+    assert roles_to_mask([UserRole.USER, UserRole.ADMIN]) == 5
+    assert mask_to_roles(5) == ["admin", "user"]
+
+    user_repo = UserRepository(db_session)
+    manager = await user_repo.create(
+        UserCreateInDB(
+            username="manager",
+            email="manager@example.com",
+            hashed_password="hashed_password",
+            roles=[UserRole.USER, UserRole.MANAGER],
+        )
+    )
+    await user_repo.create(
+        UserCreateInDB(
+            username="plain",
+            email="plain@example.com",
+            hashed_password="hashed_password",
+        )
+    )
+    assert manager.roles == ["manager", "user"]
+    assert manager.has_any_role(roles_to_mask([UserRole.MANAGER]))
+    assert not manager.has_any_role(roles_to_mask([UserRole.ADMIN]))
+
+    managers, _ = await user_repo.list_page(limit=10, role="manager")
+    assert [user.username for user in managers] == ["manager"]
+    users, _ = await user_repo.list_page(limit=10, role="user")
+    assert len(users) == 2
+
+
+@pytest.mark.asyncio
+async def test_user_repository_get_many(db_session):
+    user_repo = UserRepository(db_session)
+    users = []
+    for i in range(5):
+        users.append(
+            await user_repo.create(
+                UserCreateInDB(
+                    username=f"many{i}",
+                    email=f"many{i}@example.com",
+                    hashed_password="hashed_password",
+                )
+            )
+        )
+
+    # Маленький chunk_size: поиск идет несколькими запросами IN
+    ids = [users[3].id, 999_999, users[0].id, users[3].id, users[4].id]
+    found = await user_repo.get_many_by_ids(ids, chunk_size=2)
+    assert [user.id if user else None for user in found] == [
+        users[3].id,
+        None,
+        users[0].id,
+        users[3].id,
+        users[4].id,
+    ]
+
+    found = await user_repo.get_many_by_usernames(["many2", "nobody"], chunk_size=1)
+    assert [user.username if user else None for user in found] == ["many2", None]
+
+    emails = ["many1@example.com", "missing@example.com", "many2@example.com"]
+    found = await user_repo.get_many_by_emails(emails, use_cache=True)
+    assert [user.email if user else None for user in found] == [
+        "many1@example.com",
+        None,
+        "many2@example.com",
+    ]
+    assert await user_repo.get_many_by_ids([]) == []
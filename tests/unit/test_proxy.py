@@ -0,0 +1,225 @@
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+from services.service_gateway.main import create_app
+from services.service_gateway.proxy import (
+    ProxyRoute,
+    ReverseProxy,
+    Upstream,
+    UpstreamPool,
+    create_proxy_router,
+)
+from shared.core.config import settings
+from shared.core.security import Auth
+
+
+def make_upstream(name: str, calls: list) -> FastAPI:
+    # Заглушка экземпляра сервиса
+    app = FastAPI()
+
+    @app.api_route("/auth/echo", methods=["GET", "POST"])
+    async def echo(request: Request):
+        calls.append(name)
+        body = b"".join([chunk async for chunk in request.stream()])
+        return {
+            "instance": name,
+            "query": request.url.query,
+            "body_size": len(body),
+            "forwarded_for": request.headers.get("x-forwarded-for"),
+            "authorization": request.headers.get("authorization"),
+        }
+
+    @app.get("/api/users/flaky")
+    async def flaky():
+        calls.append(name)
+        return Response(status_code=503 if name == "a" else 200)
+
+    @app.get("/api/users/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk-{i}\n".encode()
+
+        response = StreamingResponse(chunks(), media_type="text/plain")
+        response.set_cookie("first", "1")
+        response.set_cookie("second", "2")
+        return response
+
+    return app
+
+
+class HostTransport(httpx.AsyncBaseTransport):
+    # Направляет запрос в заглушку по имени хоста
+    def __init__(self, apps: dict[str, FastAPI]):
+        self.transports = {
+            host: httpx.ASGITransport(app=app) for host, app in apps.items()
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self.transports.get(request.url.host)
+        if transport is None:
+            raise httpx.ConnectError("connection refused", request=request)
+        return await transport.handle_async_request(request)
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def proxy(calls):
+    transport = HostTransport(
+        {
+            "a": make_upstream("a", calls),
+            "b": make_upstream("b", calls),
+        }
+    )
+    proxy = ReverseProxy(
+        [
+            ProxyRoute("/auth", UpstreamPool("auth", ["http://a", "http://b"])),
+            ProxyRoute(
+                "/api/users",
+                UpstreamPool("users", ["http://a", "http://b"]),
+                require_auth=True,
+            ),
+        ],
+        retries=2,
+        transport=transport,
+    )
+    yield proxy
+
+
+@pytest.fixture
+async def gateway(proxy):
+    app = FastAPI()
+    app.include_router(create_proxy_router(proxy))
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://gateway"
+    ) as client:
+        yield client
+    await proxy.aclose()
+
+
+def bearer() -> dict:
+    token = Auth.create_access_token({"sub": "user@example.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.asyncio
+async def test_proxy_balances_and_forwards_request(gateway, calls):
+    responses = [
+        await gateway.get("/auth/echo?x=1", headers={"X-Forwarded-For": "10.0.0.1"})
+        for _ in range(4)
+    ]
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert sorted(calls) == ["a", "a", "b", "b"]
+    data = responses[0].json()
+    assert data["query"] == "x=1"
+    # Клиент не доверенный прокси: его X-Forwarded-For отбрасывается
+    assert data["forwarded_for"] == "127.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_proxy_extends_forwarded_for_from_trusted_proxy(gateway, monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["127.0.0.0/8"])
+
+    response = await gateway.get("/auth/echo", headers={"X-Forwarded-For": "10.0.0.1"})
+
+    assert response.json()["forwarded_for"] == "10.0.0.1, 127.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_proxy_streams_request_body(gateway):
+    async def body():
+        for _ in range(4):
+            yield b"x" * 1024
+
+    response = await gateway.post("/auth/echo", content=body())
+
+    assert response.status_code == 200
+    assert response.json()["body_size"] == 4096
+
+
+@pytest.mark.asyncio
+async def test_proxy_streams_response_and_keeps_repeated_headers(gateway):
+    response = await gateway.get("/api/users/stream", headers=bearer())
+
+    assert response.status_code == 200
+    assert response.text == "chunk-0\nchunk-1\nchunk-2\n"
+    assert len(response.headers.get_list("set-cookie")) == 2
+
+
+@pytest.mark.asyncio
+async def test_proxy_retries_idempotent_request_on_another_upstream(gateway, calls):
+    for _ in range(3):
+        response = await gateway.get("/api/users/flaky", headers=bearer())
+        assert response.status_code == 200
+    # Экземпляр "a" отвечает 503, запрос повторяется на "b"
+    assert calls.count("b") == 3
+
+
+@pytest.mark.asyncio
+async def test_proxy_fails_over_when_upstream_is_down(proxy, gateway, calls):
+    pool = proxy.routes[0].pool
+    pool.upstreams.insert(0, Upstream("http://down"))
+
+    for _ in range(3):
+        response = await gateway.post("/auth/echo", content=b"{}")
+        assert response.status_code == 200
+
+    status = {item["url"]: item for item in pool.status()}
+    assert status["http://down"]["healthy"] is False
+    assert status["http://down"]["failures"] == 1
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_proxy_rejects_missing_or_invalid_token_at_edge(gateway, calls):
+    missing = await gateway.get("/api/users/stream")
+    invalid = await gateway.get(
+        "/api/users/stream", headers={"Authorization": "Bearer not-a-token"}
+    )
+    refresh = await gateway.get(
+        "/api/users/stream",
+        headers={
+            "Authorization": "Bearer "
+            + Auth.create_refresh_token({"sub": "user@example.com", "typ": "refresh"})
+        },
+    )
+
+    for response in (missing, invalid, refresh):
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_proxy_warm_up_requires_ready_upstream(proxy, calls):
+    with pytest.raises(RuntimeError):
+        # У заглушек нет /ready
+        await proxy.warm_up()
+    await proxy.aclose()
+
+
+def test_gateway_proxy_mode_requires_upstreams(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_SERVICE_URLS", [])
+    with pytest.raises(ValueError):
+        create_app("proxy")
+    with pytest.raises(ValueError):
+        create_app("sideways")
+
+
+def test_gateway_proxy_mode_replaces_service_routes(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_SERVICE_URLS", ["http://auth:8000"])
+    monkeypatch.setattr(settings, "USER_SERVICE_URLS", ["http://users:8001"])
+
+    app = create_app("proxy")
+    paths = {route.path for route in app.routes}
+
+    assert "/auth/{path:path}" in paths
+    assert "/api/users/{path:path}" in paths
+    assert "/auth/login" not in paths
@@ -0,0 +1,105 @@
+import pytest
+
+from shared.core.rate_limit import (
+    InMemoryRateLimitBackend,
+    LoginRateLimiter,
+    RateLimit,
+    RateLimitExceeded,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_counts_previous_window():
+    clock = FakeClock()
+    backend = InMemoryRateLimitBackend(max_keys=10, clock=clock)
+    rate = RateLimit(limit=4, window=10)
+
+    for _ in range(4):
+        assert await backend.hit("key", rate) is None
+    assert await backend.hit("key", rate) == pytest.approx(10)
+
+    # Половина прошлого окна еще учитывается: 4 * 0.5 = 2
+    clock.now = 15
+    assert await backend.hit("key", rate) is None
+    assert await backend.hit("key", rate) is None
+    assert await backend.hit("key", rate) == pytest.approx(5)
+
+    # Через два окна счетчики полностью сбрасываются
+    clock.now = 40
+    assert await backend.hit("key", rate) is None
+
+
+@pytest.mark.asyncio
+async def test_backend_is_bounded():
+    backend = InMemoryRateLimitBackend(max_keys=2, clock=FakeClock())
+    rate = RateLimit(limit=1, window=10)
+    for key in ["a", "b", "c"]:
+        await backend.hit(key, rate)
+    assert len(backend) == 2
+    # Самый давний ключ вытеснен, поэтому снова разрешен
+    assert await backend.hit("a", rate) is None
+
+
+@pytest.mark.asyncio
+async def test_login_limiter_scopes():
+    limiter = LoginRateLimiter(
+        backend=InMemoryRateLimitBackend(max_keys=100, clock=FakeClock()),
+        per_account=RateLimit(2, 60),
+        per_ip=RateLimit(3, 60),
+        global_rate=RateLimit(100, 60),
+    )
+    await limiter.check("User@example.com", "10.0.0.1")
+    await limiter.check("user@example.com", "10.0.0.1")
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await limiter.check("user@example.com", "10.0.0.2")
+    assert exc_info.value.scope == "account"
+
+    await limiter.reset_account("user@example.com")
+    await limiter.check("user@example.com", "10.0.0.2")
+
+    await limiter.check("other@example.com", "10.0.0.1")
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await limiter.check("third@example.com", "10.0.0.1")
+    assert exc_info.value.scope == "ip"
+
+
+@pytest.mark.asyncio
+async def test_rejected_attempts_do_not_spend_global_limit():
+    limiter = LoginRateLimiter(
+        backend=InMemoryRateLimitBackend(max_keys=100, clock=FakeClock()),
+        per_account=RateLimit(100, 60),
+        per_ip=RateLimit(2, 60),
+        global_rate=RateLimit(5, 60),
+    )
+    # Один IP упирается в свой лимит, но общий лимит расходует только 2 раза
+    for _ in range(2):
+        await limiter.check("victim@example.com", "10.0.0.1")
+    for _ in range(20):
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            await limiter.check("victim@example.com", "10.0.0.1")
+        assert exc_info.value.scope == "ip"
+
+    for i in range(3):
+        await limiter.check(f"user{i}@example.com", f"10.0.1.{i}")
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await limiter.check("late@example.com", "10.0.2.1")
+    assert exc_info.value.scope == "global"
+
+
+@pytest.mark.asyncio
+async def test_peek_does_not_count():
+    backend = InMemoryRateLimitBackend(max_keys=10, clock=FakeClock())
+    rate = RateLimit(limit=1, window=10)
+
+    for _ in range(3):
+        assert await backend.peek("key", rate) is None
+    assert await backend.hit("key", rate) is None
+    assert await backend.peek("key", rate) == pytest.approx(10)
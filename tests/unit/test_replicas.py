@@ -0,0 +1,158 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from shared.db.database import Base
+from shared.db.models import User
+from shared.db.replicas import ReplicaSet
+from shared.db.repositories.refresh_token_repository import RefreshTokenRepository
+from shared.db.repositories.user_repository import UserRepository
+from shared.db.schemas.user import UserCreateInDB
+from shared.db.session import LazySession, RoutingSession
+from shared.db.user_cache import user_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def make_engine(path, with_tables=True, username=None):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    if with_tables:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            if username:
+                await conn.execute(
+                    User.__table__.insert().values(
+                        username=username,
+                        email=f"{username}@example.com",
+                        hashed_password="hashed_password",
+                        role_mask=4,
+                    )
+                )
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_until_first_write(tmp_path):
+    primary = await make_engine(tmp_path / "primary.db", username="primary")
+    replica = await make_engine(tmp_path / "replica.db", username="replica")
+    replicas = ReplicaSet([replica])
+    factory = sessionmaker(
+        primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+        replicas=replicas,
+    )
+    lazy = LazySession(factory)
+    try:
+        user_repo = UserRepository(lazy)
+        assert await user_repo.get_by_email("replica@example.com") is not None
+        assert await user_repo.get_by_email("primary@example.com") is None
+        assert replicas.replicas[0].in_use == 0
+
+        await user_repo.create(
+            UserCreateInDB(
+                username="written",
+                email="written@example.com",
+                hashed_password="hashed_password",
+            )
+        )
+        # Чтение после записи в том же запросе идет на primary
+        assert await user_repo.get_by_email("written@example.com") is not None
+        assert await user_repo.get_by_email("primary@example.com") is not None
+    finally:
+        await lazy.close()
+        await primary.dispose()
+        await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_replica_is_skipped_and_retried_later(tmp_path):
+    primary = await make_engine(tmp_path / "primary.db", username="primary")
+    broken = await make_engine(tmp_path / "broken.db", with_tables=False)
+    clock = FakeClock()
+    replicas = ReplicaSet([broken], retry_after=30, clock=clock)
+    factory = sessionmaker(
+        primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+        replicas=replicas,
+    )
+    lazy = LazySession(factory)
+    try:
+        # Чтение с реплики падает и повторяется на primary
+        result = await lazy.execute(select(User.username))
+        assert result.scalars().all() == ["primary"]
+        assert replicas.choose() is None
+        assert replicas.status()[0]["failures"] == 1
+
+        clock.now = 31
+        assert replicas.choose() is broken
+    finally:
+        await lazy.close()
+        await primary.dispose()
+        await broken.dispose()
+
+
+@pytest.mark.asyncio
+async def test_cache_filling_and_refresh_token_reads_use_primary(tmp_path):
+    primary = await make_engine(tmp_path / "primary.db", username="shared")
+    # Отстающая реплика: пользователь еще активен, refresh-токена еще нет
+    replica = await make_engine(tmp_path / "replica.db", username="shared")
+    async with primary.begin() as conn:
+        await conn.execute(User.__table__.update().values(is_active=False))
+    replicas = ReplicaSet([replica])
+    factory = sessionmaker(
+        primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+        replicas=replicas,
+    )
+    user_cache.clear()
+    try:
+        user_repo = UserRepository(LazySession(factory))
+        assert (await user_repo.get_by_email("shared@example.com")).is_active
+        cached = await user_repo.get_by_email("shared@example.com", use_cache=True)
+        assert cached.is_active is False
+        assert user_cache.get_by_email("shared@example.com").is_active is False
+        user_cache.clear()
+        [by_email] = await user_repo.get_many_by_emails(
+            ["shared@example.com"], use_cache=True
+        )
+        assert by_email.is_active is False
+        assert (
+            await user_repo.get_by_id(by_email.id, use_cache=True)
+        ).is_active is False
+
+        writer = factory()
+        await RefreshTokenRepository(writer).create(
+            by_email.id, "fresh-jti", "family", datetime.now(timezone.utc)
+        )
+        await writer.close()
+        tokens = RefreshTokenRepository(LazySession(factory))
+        assert await tokens.get_by_jti("fresh-jti") is not None
+    finally:
+        user_cache.clear()
+        await primary.dispose()
+        await replica.dispose()
+
+
+def test_replica_set_balances_by_connections_in_use():
+    first = create_async_engine("sqlite+aiosqlite:///:memory:")
+    second = create_async_engine("sqlite+aiosqlite:///:memory:")
+    replicas = ReplicaSet([first, second])
+    replicas.replicas[0].in_use = 3
+    assert replicas.choose() is second
+    replicas.replicas[1].in_use = 5
+    assert replicas.choose() is first
@@ -0,0 +1,155 @@
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+
+from services.service_gateway.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    ResponseCacheMiddleware,
+)
+from shared.core.security import Auth
+
+
+def bearer(sub: str, expires_delta: timedelta | None = None) -> dict:
+    token = Auth.create_access_token({"sub": sub}, expires_delta)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def make_app(cache: ResponseCache, calls: list) -> FastAPI:
+    app = FastAPI()
+    state = {"version": 1}
+
+    @app.get("/api/users/{user_id}")
+    async def get_user(user_id: int, response: Response):
+        calls.append(user_id)
+        response.headers["ETag"] = f'"{user_id}-{state["version"]}"'
+        return {"id": user_id, "version": state["version"]}
+
+    @app.get("/api/users/plain/list")
+    async def plain():
+        calls.append("plain")
+        return []
+
+    @app.post("/api/users/lookup")
+    async def lookup():
+        return {"users": [], "missing": []}
+
+    @app.patch("/api/users/{user_id}")
+    async def update_user(user_id: int):
+        state["version"] += 1
+        return {"id": user_id}
+
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    return app
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(max_size=100, ttl=60, max_body_size=1024)
+
+
+@pytest.fixture
+async def client(cache, calls):
+    transport = httpx.ASGITransport(app=make_app(cache, calls))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+@pytest.mark.asyncio
+async def test_response_cache_serves_repeated_polls(client, calls):
+    headers = bearer("a@example.com")
+    first = await client.get("/api/users/1", headers=headers)
+    second = await client.get("/api/users/1", headers=headers)
+    not_modified = await client.get(
+        "/api/users/1", headers={**headers, "If-None-Match": first.headers["etag"]}
+    )
+
+    assert calls == [1]
+    assert second.json() == first.json()
+    assert second.headers["x-cache"] == "hit"
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == first.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_response_cache_is_keyed_by_caller(client, calls):
+    await client.get("/api/users/1", headers=bearer("a@example.com"))
+    await client.get("/api/users/1", headers=bearer("b@example.com"))
+
+    assert calls == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_response_cache_skips_responses_without_etag(client, calls):
+    await client.get("/api/users/plain/list")
+    await client.get("/api/users/plain/list")
+
+    assert calls == ["plain", "plain"]
+
+
+@pytest.mark.asyncio
+async def test_response_cache_is_invalidated_on_write(client, cache, calls):
+    headers = bearer("a@example.com")
+    before = await client.get("/api/users/1", headers=headers)
+    await client.patch("/api/users/1", headers=headers)
+    after = await client.get("/api/users/1", headers=headers)
+
+    assert calls == [1, 1]
+    assert after.headers["etag"] != before.headers["etag"]
+    assert "x-cache" not in after.headers
+    assert cache.stats()["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_keeps_entries_on_read_only_post(client, calls):
+    await client.get("/api/users/1")
+    await client.post("/api/users/lookup", json={"ids": [1]})
+    await client.get("/api/users/1")
+
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_response_cache_does_not_store_large_bodies(calls):
+    cache = ResponseCache(max_size=100, ttl=60, max_body_size=4)
+    transport = httpx.ASGITransport(app=make_app(cache, calls))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.get("/api/users/1")
+        await c.get("/api/users/1")
+
+    assert calls == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_response_cache_rechecks_token_on_hit(client, calls):
+    headers = bearer("revoked@example.com")
+    await client.get("/api/users/1", headers=headers)
+    await client.get("/api/users/1", headers=headers)
+    assert calls == [1]
+
+    # Отозванный токен не получает ответ из кеша
+    Auth.revoke_token(headers["Authorization"].split()[1])
+    response = await client.get("/api/users/1", headers=headers)
+    assert "x-cache" not in response.headers
+    assert calls == [1, 1]
+
+    await client.get("/api/users/1", headers={"Authorization": "Bearer invalid"})
+    assert calls == [1, 1, 1]
+
+
+def test_response_cache_entry_does_not_outlive_token(cache):
+    response = CachedResponse('"1"', [], b"{}")
+    cache.put(("short",), cache.generation, response, expires_at=time.time() + 5)
+    cache.put(("expired",), cache.generation, response, expires_at=time.time() - 1)
+
+    assert cache.get(("short",)) is response
+    assert cache._cache._data[("short",)][0] <= cache._cache.clock() + 5
+    assert cache.get(("expired",)) is None
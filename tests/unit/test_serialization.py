@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from services.user_service.serialization import render_user, render_users
+from shared.db.repositories.user_repository import UserRepository
+from shared.db.schemas.user import UserCreateInDB, UserResponse
+
+
+@pytest.mark.asyncio
+async def test_row_read_path_matches_orm_serialization(db_session):
+    repository = UserRepository(db_session)
+    for i, roles in enumerate([["user"], ["admin", "user"], ["manager"]]):
+        await repository.create(
+            UserCreateInDB(
+                username=f"row{i}",
+                email=f"row{i}@example.com",
+                hashed_password="hashed_password",
+                is_active=i != 1,
+                roles=roles,
+            )
+        )
+
+    users, orm_cursor = await repository.list_page(limit=2, order_by="username")
+    rows, row_cursor = await repository.list_page_rows(limit=2, order_by="username")
+
+    expected = [UserResponse.model_validate(user).model_dump() for user in users]
+    assert json.loads(render_users(rows)) == json.loads(json.dumps(expected))
+    assert row_cursor == orm_cursor
+    assert "hashed_password" not in rows[0]
+
+    row = await repository.get_row(users[1].id)
+    assert json.loads(render_user(row))["roles"] == ["admin", "user"]
+    assert row["version"] == users[1].version
+    assert await repository.get_row(10_000) is None
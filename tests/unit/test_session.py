@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from shared.db.models import User
+from shared.db.repositories.user_repository import UserRepository
+from shared.db.schemas.user import UserCreateInDB
+from shared.db.session import LazySession, TrackedSession
+
+
+@pytest.fixture
+def session_factory(engine, create_tables):
+    return sessionmaker(
+        engine,
+        class_=AsyncSession,
+        sync_session_class=TrackedSession,
+        expire_on_commit=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_is_created_on_first_use(session_factory):
+    lazy = LazySession(session_factory)
+    assert not lazy.used
+    assert lazy.hold_time == 0.0
+    await lazy.close()
+    assert not lazy.used
+
+
+@pytest.mark.asyncio
+async def test_lazy_session_releases_connection_after_select(session_factory):
+    lazy = LazySession(session_factory)
+    try:
+        user = await UserRepository(lazy).create(
+            UserCreateInDB(
+                username="lazy",
+                email="lazy@example.com",
+                hashed_password="hashed_password",
+            )
+        )
+        result = await lazy.execute(select(User).filter(User.id == user.id))
+        assert result.scalar_one().username == "lazy"
+        assert not lazy.in_transaction()
+        assert lazy.hold_time > 0
+
+        # Изменения не фиксируются раньше времени
+        lazy.add(
+            User(
+                username="pending",
+                email="pending@example.com",
+                hashed_password="hashed_password",
+            )
+        )
+        await lazy.execute(select(User))
+        assert lazy.in_transaction()
+        await lazy.rollback()
+        assert (
+            await lazy.scalar(select(User.id).filter(User.username == "pending"))
+            is None
+        )
+    finally:
+        await lazy.close()